@@ -13,7 +13,7 @@ from telegram import Update
 from telegram.ext import MessageHandler, ContextTypes, BaseHandler, filters
 
 from modules.base import BaseModule
-from utils.message_utils import send_long_message
+from utils.message_utils import send_long_message, TELEGRAM_MAX_LENGTH
 
 logger = logging.getLogger(__name__)
 
@@ -179,29 +179,85 @@ NOTE: Ideas are handled automatically by the system. Just be helpful and convers
         if not self._client:
             self._init_client()
     
-    async def _save_idea_directly(self, idea_text: str, update: Update) -> str:
+    async def _save_idea_directly(
+        self,
+        idea_text: str,
+        update: Update,
+        prefix: str = "",
+        **kwargs
+    ) -> None:
         """
         Saves idea directly to Notion without AI processing.
-        Returns response message.
+        The idea is queued (persisted) first, then the status message is sent
+        and edited once Notion confirms.
+        
+        Args:
+            idea_text: Message text with the idea
+            update: Telegram update
+            prefix: Text shown before the status (e.g. recognized voice)
+            **kwargs: Additional arguments for reply_text (e.g., parse_mode)
         """
         if not self._ideas_module:
-            return f"❌ Ideas module not connected.\n\nIdea: {idea_text}"
+            await send_long_message(update, f"{prefix}❌ Ideas module not connected.\n\nIdea: {idea_text}", **kwargs)
+            return
         
         # Clean up the idea text
         clean_idea = extract_idea_text(idea_text)
         
         if not clean_idea:
-            return "❌ Could not extract idea from message. Please try again."
+            await send_long_message(update, f"{prefix}❌ Could not extract idea from message. Please try again.", **kwargs)
+            return
+        
+        # A long prefix (full voice transcription) goes in its own message(s),
+        # so the status message we keep editing always fits Telegram's limit
+        long_prefix = ""
+        if len(prefix) > TELEGRAM_MAX_LENGTH // 2:
+            long_prefix, prefix = prefix, ""
+        
+        reply = None
+        final_text = None
         
-        result = await self._ideas_module.save_idea(
+        async def on_complete(result: dict) -> None:
+            nonlocal final_text
+            if result["success"]:
+                final_text = self._fit_status(prefix, "✅ Idea saved to Notion!\n\n📝 ", clean_idea)
+            else:
+                final_text = self._fit_status(
+                    prefix, f"❌ Failed to save: {result['message']}\n\nIdea: ", clean_idea
+                )
+            if reply is not None:
+                await reply.edit_text(final_text, **kwargs)
+        
+        # Persist the idea before any Telegram call, so a failed reply can't lose it
+        result = await self._ideas_module.queue_idea(
             clean_idea,
-            user_id=update.effective_user.id
+            user_id=update.effective_user.id,
+            on_complete=on_complete
         )
         
-        if result["success"]:
-            return f"✅ Idea saved to Notion!\n\n📝 {clean_idea}"
-        else:
-            return f"❌ Failed to save: {result['message']}\n\nIdea: {clean_idea}"
+        if long_prefix:
+            await send_long_message(update, long_prefix.rstrip(), **kwargs)
+        
+        if not result["success"]:
+            await on_complete(result)
+            await send_long_message(update, final_text, **kwargs)
+            return
+        
+        reply = await update.message.reply_text(
+            self._fit_status(prefix, "⏳ Saving idea to Notion...\n\n📝 ", clean_idea),
+            **kwargs
+        )
+        if final_text is not None:
+            # Notion answered while the status message was being sent
+            await reply.edit_text(final_text, **kwargs)
+    
+    @staticmethod
+    def _fit_status(prefix: str, status: str, idea: str) -> str:
+        """Builds idea status message, shortening the echoed idea to fit one message"""
+        room = TELEGRAM_MAX_LENGTH - len(prefix) - len(status)
+        if len(idea) > room:
+            idea = idea[:max(room - 1, 0)] + "…"
+        return f"{prefix}{status}{idea}"
 
     async def handle_text_message(
         self,
@@ -214,8 +270,7 @@ NOTE: Ideas are handled automatically by the system. Just be helpful and convers
         # FIRST: Check if this is an idea to save
         if detect_idea_intent(user_message):
             logger.info(f"Idea detected in text message: {user_message[:50]}...")
-            response = await self._save_idea_directly(user_message, update)
-            await send_long_message(update, response)
+            await self._save_idea_directly(user_message, update)
             return
         
         # Otherwise, process with AI
@@ -309,9 +364,12 @@ NOTE: Ideas are handled automatically by the system. Just be helpful and convers
         # SECOND: Check if this is an idea to save (MOVED UP - higher priority)
         if detect_idea_intent(transcribed_text):
             logger.info(f"Idea detected in voice message: {transcribed_text[:50]}...")
-            response = await self._save_idea_directly(transcribed_text, update)
-            full_message = f"🎤 *Recognized:*\n_{transcribed_text}_\n\n{response}"
-            await send_long_message(update, full_message, parse_mode="Markdown")
+            await self._save_idea_directly(
+                transcribed_text,
+                update,
+                prefix=f"🎤 *Recognized:*\n_{transcribed_text}_\n\n",
+                parse_mode="Markdown"
+            )
             return
         
         # THIRD: Check if this is an advice request for last saved contact
@@ -1,11 +1,12 @@
 """
 Gratitude journal module with Notion integration and AI-powered weekly insights
 """
+import asyncio
 import logging
 import os
 import httpx
 import json
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime, date, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -20,6 +21,7 @@ from telegram.ext import (
 from openai import OpenAI
 
 from modules.base import BaseModule, owner_only
+from utils.json_utils import loads as json_loads
 from config.settings import (
     NOTION_GRATITUDE_DATABASE_ID, 
     SKILL_CATEGORIES,
@@ -81,6 +83,58 @@ SKILL_DESCRIPTIONS = {
     "Pattern Recognition": "Seeing patterns, connecting dots"
 }
 
+# Limits for entries sent to AI analysis
+MAX_PROMPT_ENTRY_CHARS = 200
+MAX_PROMPT_ENTRIES_CHARS = 3000
+
+# Labels and limits for weekly/monthly review messages
+WEEKLY_REVIEW = {
+    "days": 7,
+    "title": "Недельный обзор благодарности",
+    "entries_label": "Записей",
+    "themes_title": "Главные темы",
+    "max_themes": 3,
+    "challenges_title": "Обнаруженные вызовы",
+    "max_challenges": 2,
+    "max_recommendations": 2,
+    "insight_title": "Инсайт",
+    "streaks": (
+        (14, "🏆 Невероятно! Ты писал благодарность каждый день на этой неделе!"),
+        (7, "👏 Отличная последовательность! Продолжай!"),
+    ),
+}
+
+MONTHLY_REVIEW = {
+    "days": 30,
+    "title": "Месячный обзор благодарности",
+    "entries_label": "Записей за месяц",
+    "themes_title": "Главные темы месяца",
+    "max_themes": 5,
+    "challenges_title": "Вызовы месяца",
+    "max_challenges": 3,
+    "max_recommendations": 3,
+    "insight_title": "Инсайт месяца",
+    "streaks": (
+        (50, "🏆 Потрясающе! Более 50 записей за месяц!"),
+        (30, "👏 Отличная последовательность! Ты писал каждый день!"),
+        (15, "💪 Хороший прогресс! Попробуй писать чаще."),
+    ),
+}
+
+
+class WaitingForGratitudeFilter(filters.MessageFilter):
+    """
+    Passes only messages from chats that are waiting for gratitude input,
+    so other text messages never enter the handler coroutine.
+    """
+    
+    def __init__(self, waiting: Dict[int, str]):
+        super().__init__(name="WaitingForGratitude")
+        self._waiting = waiting
+    
+    def filter(self, message) -> bool:
+        return message.chat_id in self._waiting
+
 
 class GratitudeModule(BaseModule):
     """
@@ -96,8 +150,19 @@ class GratitudeModule(BaseModule):
         self._waiting_for_gratitude: Dict[int, str] = {}
         self._openai_client = None
         self._ai_assistant = None  # Ссылка на AI-ассистент
+        self._token: Optional[str] = None
+        self._headers: Dict[str, str] = {}
         logger.info(f"Gratitude module initialized with DB: {self._gratitude_db_id}")
     
+    async def on_startup(self) -> None:
+        """Reads Notion token once and prepares request headers"""
+        self._token = os.getenv("NOTION_API_TOKEN")
+        self._headers = {
+            "Authorization": f"Bearer {self._token}",
+            "Content-Type": "application/json",
+            "Notion-Version": "2022-06-28"
+        }
+    
     def set_ai_assistant(self, ai_assistant):
         """Устанавливает ссылку на AI-ассистент для передачи не-благодарностей"""
         self._ai_assistant = ai_assistant
@@ -117,7 +182,8 @@ class GratitudeModule(BaseModule):
             CommandHandler("weekly_gratitude", self.weekly_recap_command),
             CallbackQueryHandler(self.handle_time_selection, pattern="^gratitude_"),
             MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
+                filters.TEXT & ~filters.COMMAND
+                & WaitingForGratitudeFilter(self._waiting_for_gratitude),
                 self.handle_text_gratitude
             ),
         ]
@@ -297,18 +363,10 @@ class GratitudeModule(BaseModule):
     
     async def _save_to_notion(self, entry: Dict) -> bool:
         """Saves entry to Notion database"""
-        token = os.getenv("NOTION_API_TOKEN")
-        
-        if not token or not self._gratitude_db_id:
+        if not self._token or not self._gratitude_db_id:
             logger.warning("Notion token or database ID not configured")
             return False
         
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-        
         time_label = "Morning" if entry["time_of_day"] == "morning" else "Evening"
         
         data = {
@@ -330,7 +388,7 @@ class GratitudeModule(BaseModule):
             async with httpx.AsyncClient() as client:
                 response = await client.post(
                     "https://api.notion.com/v1/pages",
-                    headers=headers,
+                    headers=self._headers,
                     json=data,
                     timeout=30.0
                 )
@@ -389,7 +447,15 @@ class GratitudeModule(BaseModule):
         await update.message.reply_text("🔄 Анализирую твои записи благодарности за месяц...")
         
         # Get entries from last 30 days
-        entries = await self._get_month_entries()
+        try:
+            entries = await self._get_month_entries()
+        except Exception as e:
+            logger.error(f"Failed to get month entries from Notion: {e}")
+            await update.message.reply_text(
+                "⚠️ Не удалось загрузить записи за месяц из Notion.\n"
+                "Попробуй /review чуть позже."
+            )
+            return
         
         if not entries or len(entries) < 3:
             await update.message.reply_text(
@@ -415,17 +481,9 @@ class GratitudeModule(BaseModule):
     
     async def _get_week_entries(self) -> List[Dict]:
         """Gets entries from last 7 days from Notion"""
-        token = os.getenv("NOTION_API_TOKEN")
-        
-        if not token or not self._gratitude_db_id:
+        if not self._token or not self._gratitude_db_id:
             return []
         
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-        
         week_ago = (date.today() - timedelta(days=7)).isoformat()
         
         data = {
@@ -443,33 +501,19 @@ class GratitudeModule(BaseModule):
             async with httpx.AsyncClient() as client:
                 response = await client.post(
                     f"https://api.notion.com/v1/databases/{self._gratitude_db_id}/query",
-                    headers=headers,
+                    headers=self._headers,
                     json=data,
                     timeout=30.0
                 )
                 
                 if response.status_code == 200:
-                    results = response.json().get("results", [])
+                    results = json_loads(response.content).get("results", [])
                     entries = []
                     
                     for page in results:
-                        props = page.get("properties", {})
-                        
-                        title_arr = props.get("Gratitude", {}).get("title", [])
-                        text = title_arr[0].get("plain_text", "") if title_arr else ""
-                        
-                        date_obj = props.get("Date", {}).get("date", {})
-                        date_str = date_obj.get("start", "") if date_obj else ""
-                        
-                        select_obj = props.get("Select", {}).get("select", {})
-                        time_str = select_obj.get("name", "") if select_obj else ""
-                        
-                        if text:  # Only add non-empty entries
-                            entries.append({
-                                "text": text,
-                                "date": date_str,
-                                "time": time_str
-                            })
+                        entry = self._parse_entry_page(page)
+                        if entry:  # Only add non-empty entries
+                            entries.append(entry)
                     
                     return entries
                 else:
@@ -561,7 +605,9 @@ class GratitudeModule(BaseModule):
 
 Пиши на русском, будь конкретным и лаконичным."""
 
-            response = client.chat.completions.create(
+            # Sync OpenAI client - run in a thread so the event loop isn't blocked
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": "Ты мудрый коуч, который анализирует дневники благодарности и даёт глубокие инсайты на русском языке. Ты умеешь видеть паттерны и давать конкретные рекомендации."},
@@ -599,8 +645,6 @@ class GratitudeModule(BaseModule):
     
     async def _format_weekly_recap_russian(self, entries: List[Dict], analysis: Dict, metrics: Dict[str, int] = None) -> str:
         """Formats weekly recap message in Russian with categorized structure"""
-        from datetime import datetime, date, timedelta
-        
         # Calculate date range
         today = date.today()
         week_ago = today - timedelta(days=7)
@@ -712,18 +756,9 @@ class GratitudeModule(BaseModule):
     
     async def _get_weekly_metrics(self) -> Dict[str, int]:
         """Fetch weekly metrics from all Notion databases"""
-        from datetime import date, timedelta
-        
-        token = os.getenv("NOTION_API_TOKEN")
-        if not token:
+        if not self._token:
             return {}
         
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-        
         week_ago = (date.today() - timedelta(days=7)).isoformat()
         
         metrics = {
@@ -739,7 +774,7 @@ class GratitudeModule(BaseModule):
                 try:
                     response = await client.post(
                         f"https://api.notion.com/v1/databases/{contacts_db_id}/query",
-                        headers=headers,
+                        headers=self._headers,
                         json={
                             "filter": {
                                 "property": "Date",
@@ -749,7 +784,7 @@ class GratitudeModule(BaseModule):
                         timeout=30.0
                     )
                     if response.status_code == 200:
-                        metrics["contacts"] = len(response.json().get("results", []))
+                        metrics["contacts"] = len(json_loads(response.content).get("results", []))
                 except Exception as e:
                     logger.warning(f"Failed to fetch contacts: {e}")
                 
@@ -758,7 +793,7 @@ class GratitudeModule(BaseModule):
                 try:
                     response = await client.post(
                         f"https://api.notion.com/v1/databases/{ideas_db_id}/query",
-                        headers=headers,
+                        headers=self._headers,
                         json={
                             "filter": {
                                 "property": "Created",
@@ -768,7 +803,7 @@ class GratitudeModule(BaseModule):
                         timeout=30.0
                     )
                     if response.status_code == 200:
-                        metrics["ideas"] = len(response.json().get("results", []))
+                        metrics["ideas"] = len(json_loads(response.content).get("results", []))
                 except Exception as e:
                     logger.warning(f"Failed to fetch ideas: {e}")
                 
@@ -780,16 +815,36 @@ class GratitudeModule(BaseModule):
         
         return metrics
     
+    def _build_prompt_entries(self, entries: List[Dict]) -> str:
+        """
+        Builds entries block for AI prompt.
+        Skips repeated texts and caps entry and total length to save tokens.
+        """
+        seen = set()
+        lines = []
+        total = 0
+        
+        for e in entries:
+            key = e['text'].strip().lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            line = f"- {e['date']} ({e['time']}): {e['text'][:MAX_PROMPT_ENTRY_CHARS]}"
+            total += len(line) + 1
+            if total > MAX_PROMPT_ENTRIES_CHARS:
+                break
+            lines.append(line)
+        
+        return "\n".join(lines)
+    
     async def _analyze_patterns(self, entries: List[Dict]) -> Dict:
         """Uses AI to analyze gratitude patterns and detect challenges"""
         try:
             client = self._get_openai_client()
             
-            # Combine all entries into text
-            entries_text = "\n".join([
-                f"- {e['date']} ({e['time']}): {e['text']}" 
-                for e in entries
-            ])
+            # Combine unique entries into text (capped to save tokens)
+            entries_text = self._build_prompt_entries(entries)
             
             # Create skill list for AI
             skills_list = "\n".join([
@@ -822,7 +877,9 @@ Respond in JSON format:
 Focus on actionable insights. If challenges are mentioned, recommend skills that address them.
 If no challenges, recommend skills that enhance what's already working."""
 
-            response = client.chat.completions.create(
+            # Sync OpenAI client - run in a thread so the event loop isn't blocked
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": "You are an insightful life coach analyzing gratitude journals."},
@@ -856,35 +913,37 @@ If no challenges, recommend skills that enhance what's already working."""
         """Gets current skill progress from Notion"""
         from config.settings import NOTION_SKILLS_DATABASE_ID, MAX_VALUES
         
-        token = os.getenv("NOTION_API_TOKEN")
-        if not token:
+        if not self._token:
             return {}
         
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
+        data = {
+            "filter": {
+                "property": "Status",
+                "select": {"equals": "Изучаю"}
+            },
+            "page_size": 100
         }
         
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"https://api.notion.com/v1/databases/{NOTION_SKILLS_DATABASE_ID}/query",
-                    headers=headers,
-                    json={
-                        "filter": {
-                            "property": "Status",
-                            "select": {"equals": "Изучаю"}
-                        }
-                    },
-                    timeout=30.0
-                )
+                progress = {}
                 
-                if response.status_code == 200:
-                    results = response.json().get("results", [])
-                    progress = {}
+                while True:
+                    response = await client.post(
+                        f"https://api.notion.com/v1/databases/{NOTION_SKILLS_DATABASE_ID}/query",
+                        headers=self._headers,
+                        json=data,
+                        timeout=30.0
+                    )
                     
-                    for page in results:
+                    if response.status_code != 200:
+                        # Partial data would show skills from missing pages as not started
+                        logger.error(f"Notion query error: {response.status_code}")
+                        return {}
+                    
+                    payload = json_loads(response.content)
+                    
+                    for page in payload.get("results", []):
                         props = page.get("properties", {})
                         name_arr = props.get("Skill", {}).get("title", [])
                         name = name_arr[0].get("plain_text", "") if name_arr else ""
@@ -896,7 +955,10 @@ If no challenges, recommend skills that enhance what's already working."""
                                 total += (val / max_val) * 100
                             progress[name] = total / len(MAX_VALUES)
                     
-                    return progress
+                    next_cursor = payload.get("next_cursor")
+                    if not payload.get("has_more") or not next_cursor:
+                        return progress
+                    data["start_cursor"] = next_cursor
                     
         except Exception as e:
             logger.error(f"Failed to get skills progress: {e}")
@@ -910,80 +972,20 @@ If no challenges, recommend skills that enhance what's already working."""
         skills_progress: Dict[str, float]
     ) -> str:
         """Formats the weekly review message"""
-        today = date.today()
-        week_ago = today - timedelta(days=7)
-        
-        message = f"📊 **Недельный обзор благодарности**\n"
-        message += f"_{week_ago.strftime('%d.%m')} - {today.strftime('%d.%m')}_\n\n"
-        
-        # Entry stats
-        morning_count = len([e for e in entries if e.get('time') == 'Morning'])
-        evening_count = len([e for e in entries if e.get('time') == 'Evening'])
-        message += f"📝 Записей: {len(entries)} ({morning_count} утро, {evening_count} вечер)\n\n"
-        
-        # Themes
-        themes = analysis.get("themes", [])
-        if themes:
-            message += "🔥 **Главные темы:**\n"
-            for theme in themes[:3]:
-                message += f"• {theme}\n"
-            message += "\n"
-        
-        # Positive patterns
-        positive = analysis.get("positive_patterns", "")
-        if positive:
-            message += f"✨ **Что делает тебя счастливым:**\n_{positive}_\n\n"
-        
-        # Challenges and skill recommendations
-        challenges = analysis.get("challenges", [])
-        recommended = analysis.get("recommended_skills", [])
-        
-        if challenges:
-            message += "⚡ **Обнаруженные вызовы:**\n"
-            for ch in challenges[:2]:
-                message += f"• {ch}\n"
-            message += "\n"
-        
-        if recommended:
-            message += "💡 **Рекомендации по навыкам:**\n"
-            for rec in recommended[:2]:
-                skill_name = rec.get("skill", "")
-                reason = rec.get("reason", "")
-                
-                # Check if already learning
-                progress = skills_progress.get(skill_name, 0)
-                if progress > 0:
-                    message += f"📚 **{skill_name}** ({progress:.0f}%)\n"
-                    message += f"_Ты уже изучаешь это! Продолжай._\n\n"
-                else:
-                    message += f"📚 **{skill_name}** (не начат)\n"
-                    message += f"_{reason}_\n\n"
-        
-        # AI insight
-        insight = analysis.get("insight", "")
-        if insight:
-            message += f"🎯 **Инсайт:**\n_{insight}_\n\n"
-        
-        # Streak encouragement
-        if len(entries) >= 14:
-            message += "🏆 Невероятно! Ты писал благодарность каждый день на этой неделе!\n"
-        elif len(entries) >= 7:
-            message += "👏 Отличная последовательность! Продолжай!\n"
-        
-        return message
+        return self._format_review(entries, analysis, skills_progress, WEEKLY_REVIEW)
     
     async def _get_month_entries(self) -> List[Dict]:
         """Gets entries from last 30 days from Notion"""
-        token = os.getenv("NOTION_API_TOKEN")
-        
-        if not token or not self._gratitude_db_id:
-            return []
-        
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
+        return [entry async for entry in self._iter_month_entries()]
+    
+    async def _iter_month_entries(self) -> AsyncIterator[Dict]:
+        """
+        Yields entries from last 30 days from Notion page by page.
+        Follows `next_cursor` while `has_more`, so dense months aren't truncated.
+        Errors propagate to the caller: a review must not be built from part of a month.
+        """
+        if not self._token or not self._gratitude_db_id:
+            return
         
         month_ago = (date.today() - timedelta(days=30)).isoformat()
         
@@ -998,46 +1000,57 @@ If no challenges, recommend skills that enhance what's already working."""
             "page_size": 100
         }
         
-        try:
-            async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient() as client:
+            while True:
                 response = await client.post(
                     f"https://api.notion.com/v1/databases/{self._gratitude_db_id}/query",
-                    headers=headers,
+                    headers=self._headers,
                     json=data,
                     timeout=30.0
                 )
                 
-                if response.status_code == 200:
-                    results = response.json().get("results", [])
-                    entries = []
-                    
-                    for page in results:
-                        props = page.get("properties", {})
-                        
-                        title_arr = props.get("Gratitude", {}).get("title", [])
-                        text = title_arr[0].get("plain_text", "") if title_arr else ""
-                        
-                        date_obj = props.get("Date", {}).get("date", {})
-                        date_str = date_obj.get("start", "") if date_obj else ""
-                        
-                        select_obj = props.get("Select", {}).get("select", {})
-                        time_str = select_obj.get("name", "") if select_obj else ""
-                        
-                        if text:
-                            entries.append({
-                                "text": text,
-                                "date": date_str,
-                                "time": time_str
-                            })
-                    
-                    return entries
-                else:
+                if response.status_code != 200:
+                    # Any other status (even 2xx/3xx) is not a results page we can trust
                     logger.error(f"Notion query error: {response.status_code}")
-                    return []
-                    
-        except Exception as e:
-            logger.error(f"Failed to get month entries from Notion: {e}")
-            return []
+                    raise httpx.HTTPStatusError(
+                        f"Notion query error: {response.status_code}",
+                        request=response.request,
+                        response=response
+                    )
+                
+                payload = json_loads(response.content)
+                
+                for page in payload.get("results", []):
+                    entry = self._parse_entry_page(page)
+                    if entry:
+                        yield entry
+                
+                next_cursor = payload.get("next_cursor")
+                if not payload.get("has_more") or not next_cursor:
+                    return
+                data["start_cursor"] = next_cursor
+    
+    def _parse_entry_page(self, page: Dict) -> Optional[Dict]:
+        """Parses gratitude page into entry dict, None if the entry is empty"""
+        props = page.get("properties", {})
+        
+        title_arr = props.get("Gratitude", {}).get("title", [])
+        text = title_arr[0].get("plain_text", "") if title_arr else ""
+        
+        if not text:
+            return None
+        
+        date_obj = props.get("Date", {}).get("date", {})
+        date_str = date_obj.get("start", "") if date_obj else ""
+        
+        select_obj = props.get("Select", {}).get("select", {})
+        time_str = select_obj.get("name", "") if select_obj else ""
+        
+        return {
+            "text": text,
+            "date": date_str,
+            "time": time_str
+        }
     
     async def _format_monthly_review(
         self, 
@@ -1046,22 +1059,32 @@ If no challenges, recommend skills that enhance what's already working."""
         skills_progress: Dict[str, float]
     ) -> str:
         """Formats the monthly review message"""
+        return self._format_review(entries, analysis, skills_progress, MONTHLY_REVIEW)
+    
+    def _format_review(
+        self,
+        entries: List[Dict],
+        analysis: Dict,
+        skills_progress: Dict[str, float],
+        period: Dict
+    ) -> str:
+        """Formats weekly/monthly review message using period labels and limits"""
         today = date.today()
-        month_ago = today - timedelta(days=30)
+        period_start = today - timedelta(days=period["days"])
         
-        message = f"📊 **Месячный обзор благодарности**\n"
-        message += f"_{month_ago.strftime('%d.%m')} - {today.strftime('%d.%m')}_\n\n"
+        message = f"📊 **{period['title']}**\n"
+        message += f"_{period_start.strftime('%d.%m')} - {today.strftime('%d.%m')}_\n\n"
         
         # Entry stats
         morning_count = len([e for e in entries if e.get('time') == 'Morning'])
         evening_count = len([e for e in entries if e.get('time') == 'Evening'])
-        message += f"📝 Записей за месяц: {len(entries)} ({morning_count} утро, {evening_count} вечер)\n\n"
+        message += f"📝 {period['entries_label']}: {len(entries)} ({morning_count} утро, {evening_count} вечер)\n\n"
         
         # Themes
         themes = analysis.get("themes", [])
         if themes:
-            message += "🔥 **Главные темы месяца:**\n"
-            for theme in themes[:5]:
+            message += f"🔥 **{period['themes_title']}:**\n"
+            for theme in themes[:period["max_themes"]]:
                 message += f"• {theme}\n"
             message += "\n"
         
@@ -1075,17 +1098,18 @@ If no challenges, recommend skills that enhance what's already working."""
         recommended = analysis.get("recommended_skills", [])
         
         if challenges:
-            message += "⚡ **Вызовы месяца:**\n"
-            for ch in challenges[:3]:
+            message += f"⚡ **{period['challenges_title']}:**\n"
+            for ch in challenges[:period["max_challenges"]]:
                 message += f"• {ch}\n"
             message += "\n"
         
         if recommended:
             message += "💡 **Рекомендации по навыкам:**\n"
-            for rec in recommended[:3]:
+            for rec in recommended[:period["max_recommendations"]]:
                 skill_name = rec.get("skill", "")
                 reason = rec.get("reason", "")
                 
+                # Check if already learning
                 progress = skills_progress.get(skill_name, 0)
                 if progress > 0:
                     message += f"📚 **{skill_name}** ({progress:.0f}%)\n"
@@ -1097,15 +1121,13 @@ If no challenges, recommend skills that enhance what's already working."""
         # AI insight
         insight = analysis.get("insight", "")
         if insight:
-            message += f"🎯 **Инсайт месяца:**\n_{insight}_\n\n"
-        
-        # Monthly encouragement
-        if len(entries) >= 50:
-            message += "🏆 Потрясающе! Более 50 записей за месяц!\n"
-        elif len(entries) >= 30:
-            message += "👏 Отличная последовательность! Ты писал каждый день!\n"
-        elif len(entries) >= 15:
-            message += "💪 Хороший прогресс! Попробуй писать чаще.\n"
+            message += f"🎯 **{period['insight_title']}:**\n_{insight}_\n\n"
+        
+        # Streak encouragement (thresholds in descending order)
+        for threshold, text in period["streaks"]:
+            if len(entries) >= threshold:
+                message += f"{text}\n"
+                break
         
         return message
     
@@ -1,17 +1,60 @@
 """
 Ideas recording module for Notion
 """
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import random
+import sqlite3
+import time
 import httpx
-from typing import Optional
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
 from telegram import Update
 from telegram.ext import ContextTypes, BaseHandler, MessageHandler, filters
 
 from modules.base import BaseModule
+from config.settings import DATA_DIR
+from utils.json_utils import dumps as json_dumps, loads as json_loads
+from utils.rate_limit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Ideas database ID formats (without and with dashes)
+DATABASE_ID_CANDIDATES = (
+    "2e28db7c936780b28d66e45ab2e6f7e6",
+    "2e28db7c-9367-80b2-8d66-e45ab2e6f7e6",
+)
+
+# Notion allows ~3 requests per second
+NOTION_MAX_CONCURRENT = 3
+NOTION_RATE_PER_SECOND = 2.5
+
+# Retries for 429/5xx responses (exponential backoff with full jitter)
+NOTION_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 16.0
+
+# Duplicate saves of the same idea within this window return the first result
+IDEMPOTENCY_WINDOW = 10 * 60
+IDEMPOTENCY_CACHE_SIZE = 1024
+
+# File for storing the database ID format that Notion accepted
+DATABASE_ID_FILE = "/tmp/ideas_database_id.json"
+# Seconds before probing the database ID format again after an inconclusive probe
+RESOLVE_RETRY_DELAY = 10 * 60
+
+# SQLite queue of ideas not yet saved to Notion (survives restarts)
+QUEUE_DB_PATH = DATA_DIR / "ideas_queue.db"
+# Seconds before a transiently failed idea (429/5xx/network) is sent again,
+# doubled after every failed attempt
+REQUEUE_DELAY = 60
+# Failed attempts after which the user is told the save failed; the row is kept
+# and gets one more attempt on every startup
+MAX_SAVE_ATTEMPTS = 4
+
 
 class IdeasModule(BaseModule):
     """
@@ -26,8 +69,20 @@ class IdeasModule(BaseModule):
         )
         self.notion_token = os.getenv("NOTION_API_TOKEN")
         # Use database_id, not data_source_id
-        self.database_id = "2e28db7c936780b28d66e45ab2e6f7e6"
+        self.database_id = DATABASE_ID_CANDIDATES[0]
         self.notion_api_url = "https://api.notion.com/v1/pages"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._headers: Optional[dict] = self._build_headers(self.notion_token)
+        self._body_template = self._build_body_template(self.database_id)
+        self._id_resolved = False
+        self._resolve_retry_at = 0.0  # monotonic time before which probing is skipped
+        self._resolve_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(NOTION_MAX_CONCURRENT)
+        self._bucket = TokenBucket(rate=NOTION_RATE_PER_SECOND, capacity=NOTION_MAX_CONCURRENT)
+        self._recent_saves: OrderedDict = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._save_tasks: set = set()
         
         # Log initialization status
         if self.notion_token:
@@ -39,156 +94,487 @@ class IdeasModule(BaseModule):
         """This module has no direct handlers - works through AI"""
         return []
     
-    async def save_idea(self, idea_text: str, user_id: int = None) -> dict:
-        """
-        Saves idea to Notion.
-        
-        Args:
-            idea_text: Idea text (already processed by AI)
-            user_id: Telegram user ID
-            
-        Returns:
-            dict with result: {"success": bool, "message": str, "url": str}
-        """
-        # Re-read token in case it was set later
-        token = os.getenv("NOTION_API_TOKEN")
+    @staticmethod
+    def _build_headers(token: Optional[str]) -> Optional[dict]:
+        """Builds Notion request headers, None if token is not set"""
         if not token:
-            logger.error("NOTION_API_TOKEN not set in environment")
-            return {
-                "success": False,
-                "message": "Notion not configured (no token)",
-                "url": None
-            }
-        
-        headers = {
+            return None
+        return {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28"
         }
-        
-        # Format data for page creation
-        data = {
-            "parent": {
-                "database_id": self.database_id
-            },
-            "properties": {
-                "Idea": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": idea_text[:2000]  # Notion limit
-                            }
-                        }
-                    ]
-                }
-            }
-        }
-        
-        logger.info(f"Saving idea to Notion: {idea_text[:50]}...")
-        logger.info(f"Database ID: {self.database_id}")
-        
+    
+    @staticmethod
+    def _build_body_template(database_id: str) -> bytes:
+        """
+        Builds page-create JSON body with a %s slot for the encoded title,
+        so each save does one string encode instead of building nested dicts.
+        """
+        return (
+            '{"parent":{"database_id":"%s"},'
+            '"properties":{"Idea":{"title":[{"text":{"content":%%s}}]}}}' % database_id
+        ).encode("utf-8")
+    
+    def _load_database_id(self) -> None:
+        """Loads database_id format resolved in a previous run"""
+        try:
+            if os.path.exists(DATABASE_ID_FILE):
+                with open(DATABASE_ID_FILE, 'r') as f:
+                    database_id = json.load(f).get("database_id")
+                if database_id in DATABASE_ID_CANDIDATES:
+                    self._set_database_id(database_id)
+                    self._id_resolved = True
+        except Exception as e:
+            logger.error(f"Error loading ideas database ID: {e}")
+    
+    def _set_database_id(self, database_id: str) -> None:
+        """Switches database_id and rebuilds body template"""
+        self.database_id = database_id
+        self._body_template = self._build_body_template(database_id)
+    
+    def _remember_database_id(self, database_id: str) -> None:
+        """Marks database_id format as accepted by Notion and persists it"""
+        self._set_database_id(database_id)
+        self._id_resolved = True
         try:
-            async with httpx.AsyncClient() as client:
+            with open(DATABASE_ID_FILE, 'w') as f:
+                json.dump({"database_id": database_id}, f)
+        except Exception as e:
+            logger.error(f"Error saving ideas database ID: {e}")
+    
+    async def _resolve_database_id(self, client: httpx.AsyncClient, headers: dict) -> None:
+        """
+        Probes which database_id format Notion accepts (without/with dashes)
+        once and remembers it, so saves never pay a 404 + retry round-trip.
+        
+        Only a 404 rules a format out. Any other error leaves the format unknown:
+        saves keep the current ID (with the 404 fallback in save_idea) and
+        probing is retried after RESOLVE_RETRY_DELAY.
+        """
+        async with self._resolve_lock:
+            if self._id_resolved or time.monotonic() < self._resolve_retry_at:
+                return
+            
+            # Format resolved in a previous run
+            self._load_database_id()
+            if self._id_resolved:
+                return
+            
+            for database_id in DATABASE_ID_CANDIDATES:
+                try:
+                    async with self._semaphore:
+                        await self._bucket.acquire()
+                        response = await client.get(
+                            f"https://api.notion.com/v1/databases/{database_id}",
+                            headers=headers
+                        )
+                except httpx.HTTPError as e:
+                    logger.warning(f"Ideas database ID probe failed: {e}")
+                    break
+                logger.info(f"Ideas database ID {database_id}: {response.status_code}")
+                
+                if response.is_success:
+                    self._remember_database_id(database_id)
+                    return
+                if response.status_code != 404:
+                    # Token, sharing or server problem - says nothing about the format
+                    break
+            else:
+                logger.error("Ideas database not found with any ID format")
+            
+            self._resolve_retry_at = time.monotonic() + RESOLVE_RETRY_DELAY
+    
+    def refresh_token(self) -> None:
+        """Re-reads NOTION_API_TOKEN from environment and rebuilds headers"""
+        self.notion_token = os.getenv("NOTION_API_TOKEN")
+        self._headers = self._build_headers(self.notion_token)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Returns shared HTTP client, so connections to Notion are kept alive"""
+        if self._client is None:
+            # HTTP/2: compressed headers, concurrent saves share one connection
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+            )
+        return self._client
+    
+    async def on_startup(self) -> None:
+        """Requeues ideas that were not saved before the last shutdown"""
+        pending = await asyncio.to_thread(self._load_pending)
+        unsaved = []
+        for row_id, idea_text, user_id, page_url, attempts in pending:
+            if page_url is not None:
+                # Saved before, only the cleanup failed - don't create a duplicate page
+                try:
+                    await asyncio.to_thread(self._delete_pending, row_id)
+                except Exception as e:
+                    logger.error(f"Error removing saved idea {row_id} from queue: {e}")
+            else:
+                unsaved.append((row_id, idea_text, user_id, None, attempts))
+        if unsaved:
+            logger.info(f"Requeueing {len(unsaved)} unsaved ideas")
+        for item in unsaved:
+            self._get_queue().put_nowait(item)
+    
+    async def on_shutdown(self) -> None:
+        """Stops queue worker and closes HTTP client on shutdown"""
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            self._worker_task = None
+        # Unfinished saves keep their rows and are requeued on next startup
+        for task in self._save_tasks:
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @staticmethod
+    def _idempotency_key(idea_text: str, user_id: Optional[int]) -> str:
+        """Deterministic key for an idea, used to collapse duplicate saves"""
+        return hashlib.sha256(f"{user_id}:{idea_text}".encode("utf-8")).hexdigest()[:32]
+    
+    def _get_recent_save(self, key: str) -> Optional[dict]:
+        """Returns result of the same save made within the idempotency window"""
+        cached = self._recent_saves.get(key)
+        if cached is None:
+            return None
+        saved_at, result = cached
+        if time.monotonic() - saved_at > IDEMPOTENCY_WINDOW:
+            del self._recent_saves[key]
+            return None
+        return result
+    
+    def _remember_save(self, key: str, result: dict) -> None:
+        """Stores successful save result, evicting the oldest entries"""
+        self._recent_saves[key] = (time.monotonic(), result)
+        self._recent_saves.move_to_end(key)
+        while len(self._recent_saves) > IDEMPOTENCY_CACHE_SIZE:
+            self._recent_saves.popitem(last=False)
+    
+    async def _post_page(
+        self,
+        client: httpx.AsyncClient,
+        headers: dict,
+        body: bytes
+    ) -> httpx.Response:
+        """
+        Posts page to Notion, retrying 429/5xx with exponential backoff
+        and full jitter. Retry-After header is respected when present.
+        """
+        for attempt in range(NOTION_MAX_RETRIES):
+            # Queue bursts locally instead of hitting Notion's rate limit
+            async with self._semaphore:
+                await self._bucket.acquire()
                 response = await client.post(
                     self.notion_api_url,
                     headers=headers,
-                    json=data,
+                    content=body,
                     timeout=30.0
                 )
+            
+            status = response.status_code
+            if status != 429 and status < 500:
+                return response
+            if attempt == NOTION_MAX_RETRIES - 1:
+                break
+            
+            retry_after = response.headers.get("retry-after")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            
+            logger.warning(
+                f"Notion API {status}, retry {attempt + 1}/{NOTION_MAX_RETRIES - 1} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+        
+        return response
+    
+    def _init_queue_db(self) -> None:
+        """Creates pending ideas table and adds columns missing in older files"""
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(QUEUE_DB_PATH))
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS pending_ideas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idea_text TEXT NOT NULL,
+                user_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                page_url TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pending_ideas)")}
+        if "page_url" not in columns:
+            # Set once Notion accepted the idea; such rows are never posted again
+            conn.execute("ALTER TABLE pending_ideas ADD COLUMN page_url TEXT")
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE pending_ideas ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+        conn.close()
+    
+    def _load_pending(self) -> list:
+        """Returns persisted ideas as (id, idea_text, user_id, page_url, attempts) rows"""
+        self._init_queue_db()
+        conn = sqlite3.connect(str(QUEUE_DB_PATH))
+        rows = conn.execute(
+            "SELECT id, idea_text, user_id, page_url, attempts FROM pending_ideas ORDER BY id"
+        ).fetchall()
+        conn.close()
+        return rows
+    
+    def _persist_pending(self, idea_text: str, user_id: Optional[int]) -> int:
+        """Persists idea before it is sent, returns row id"""
+        self._init_queue_db()
+        conn = sqlite3.connect(str(QUEUE_DB_PATH))
+        cursor = conn.execute(
+            "INSERT INTO pending_ideas (idea_text, user_id) VALUES (?, ?)",
+            (idea_text, user_id)
+        )
+        conn.commit()
+        row_id = cursor.lastrowid
+        conn.close()
+        return row_id
+    
+    def _record_attempt(self, row_id: int, attempts: int) -> None:
+        """Stores number of failed save attempts for a queued idea"""
+        conn = sqlite3.connect(str(QUEUE_DB_PATH))
+        conn.execute("UPDATE pending_ideas SET attempts = ? WHERE id = ?", (attempts, row_id))
+        conn.commit()
+        conn.close()
+    
+    def _mark_saved(self, row_id: int, page_url: str) -> None:
+        """Records that the idea reached Notion, so the row is never posted again"""
+        conn = sqlite3.connect(str(QUEUE_DB_PATH))
+        conn.execute("UPDATE pending_ideas SET page_url = ? WHERE id = ?", (page_url, row_id))
+        conn.commit()
+        conn.close()
+    
+    def _delete_pending(self, row_id: int) -> None:
+        """Removes idea from the persistent queue once saved"""
+        conn = sqlite3.connect(str(QUEUE_DB_PATH))
+        conn.execute("DELETE FROM pending_ideas WHERE id = ?", (row_id,))
+        conn.commit()
+        conn.close()
+    
+    async def _finish_row(self, row_id: int, result: dict) -> None:
+        """
+        Records the final outcome of a queued idea. Errors are only logged:
+        the user must still get the result even if SQLite is unavailable.
+        """
+        if result["success"]:
+            try:
+                await asyncio.to_thread(self._mark_saved, row_id, result["url"] or "")
+            except Exception as e:
+                logger.error(f"Error marking idea {row_id} as saved: {e}")
+        try:
+            await asyncio.to_thread(self._delete_pending, row_id)
+        except Exception as e:
+            logger.error(f"Error removing idea {row_id} from queue: {e}")
+    
+    @staticmethod
+    async def _notify(
+        on_complete: Optional[Callable[[dict], Awaitable[None]]],
+        result: dict
+    ) -> None:
+        """Reports save result to the caller, if it asked for one"""
+        if on_complete is None:
+            return
+        try:
+            await on_complete(result)
+        except Exception as e:
+            logger.error(f"Error reporting idea save result: {e}")
+    
+    def _requeue_later(self, item: tuple, delay: float) -> None:
+        """Puts a transiently failed idea back on the queue after `delay` seconds"""
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, item)
+    
+    def _get_queue(self) -> asyncio.Queue:
+        """Returns save queue, starting the worker on first use"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker())
+        return self._queue
+    
+    async def _worker(self) -> None:
+        """
+        Starts a save task for every queued idea. Saves don't wait for each other:
+        one idea sleeping in retry backoff doesn't hold up the rest, and the
+        semaphore and token bucket in _post_page still cap load on Notion.
+        """
+        while True:
+            item = await self._queue.get()
+            task = asyncio.create_task(self._process(item))
+            self._save_tasks.add(task)
+            task.add_done_callback(self._save_tasks.discard)
+            self._queue.task_done()
+    
+    async def _process(self, item: tuple) -> None:
+        """Saves one queued idea to Notion and reports the result"""
+        row_id, idea_text, user_id, on_complete, attempts = item
+        try:
+            result = await self.save_idea(idea_text, user_id=user_id)
+            
+            if not result["success"] and result.get("retryable"):
+                attempts += 1
+                try:
+                    await asyncio.to_thread(self._record_attempt, row_id, attempts)
+                except Exception as e:
+                    logger.error(f"Error recording attempt for idea {row_id}: {e}")
                 
-                logger.info(f"Notion API response: {response.status_code}")
+                if attempts < MAX_SAVE_ATTEMPTS:
+                    # Transient failure: the user keeps seeing "saving" while we retry
+                    delay = REQUEUE_DELAY * 2 ** (attempts - 1)
+                    logger.warning(
+                        f"Idea save failed ({result['message']}), "
+                        f"attempt {attempts}/{MAX_SAVE_ATTEMPTS}, retrying in {delay}s"
+                    )
+                    self._requeue_later((row_id, idea_text, user_id, on_complete, attempts), delay)
+                    return
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    page_url = result.get("url", "")
-                    logger.info(f"Idea saved successfully: {page_url}")
-                    return {
-                        "success": True,
-                        "message": "Idea saved to Notion",
-                        "url": page_url
-                    }
-                else:
-                    error_text = response.text
-                    logger.error(f"Notion API error: {response.status_code} - {error_text}")
-                    
-                    # Try alternative database_id format
-                    if response.status_code == 404:
-                        return await self._try_alternative_save(token, idea_text, headers)
-                    
-                    return {
-                        "success": False,
-                        "message": f"Notion API error: {response.status_code}",
-                        "url": None
-                    }
-                    
+                # Out of attempts for this run: tell the user, keep the row for next startup
+                logger.error(f"Giving up on idea {row_id} until restart: {result['message']}")
+                await self._notify(on_complete, {
+                    **result,
+                    "message": f"{result['message']} (will retry after bot restart)"
+                })
+                return
+            
+            # Saved, or rejected for good (bad request, missing database, no token) -
+            # either way resending won't change the outcome the user is told about
+            await self._finish_row(row_id, result)
+            await self._notify(on_complete, result)
         except Exception as e:
-            logger.error(f"Error saving idea to Notion: {e}")
+            logger.error(f"Error saving queued idea {row_id}: {e}")
+    
+    async def queue_idea(
+        self,
+        idea_text: str,
+        user_id: int = None,
+        on_complete: Optional[Callable[[dict], Awaitable[None]]] = None
+    ) -> dict:
+        """
+        Persists idea locally and saves it to Notion in the background,
+        so the caller can answer the user without waiting for Notion.
+        
+        Args:
+            idea_text: Idea text (already processed by AI)
+            user_id: Telegram user ID
+            on_complete: Called with save_idea result once Notion answers
+            
+        Returns:
+            dict with result: {"success": bool, "message": "queued", "url": None}
+        """
+        try:
+            row_id = await asyncio.to_thread(self._persist_pending, idea_text, user_id)
+        except Exception as e:
+            logger.error(f"Error persisting idea: {e}")
             return {
                 "success": False,
                 "message": f"Error: {str(e)}",
                 "url": None
             }
+        
+        self._get_queue().put_nowait((row_id, idea_text, user_id, on_complete, 0))
+        return {
+            "success": True,
+            "message": "queued",
+            "url": None
+        }
     
-    async def _try_alternative_save(self, token: str, idea_text: str, headers: dict) -> dict:
-        """Tries alternative database_id format with dashes"""
-        # Try with dashes
-        alt_database_id = "2e28db7c-9367-80b2-8d66-e45ab2e6f7e6"
+    async def save_idea(self, idea_text: str, user_id: int = None) -> dict:
+        """
+        Saves idea to Notion.
         
-        data = {
-            "parent": {
-                "database_id": alt_database_id
-            },
-            "properties": {
-                "Idea": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": idea_text[:2000]
-                            }
-                        }
-                    ]
-                }
+        Args:
+            idea_text: Idea text (already processed by AI)
+            user_id: Telegram user ID
+            
+        Returns:
+            dict with result: {"success": bool, "message": str, "url": str}.
+            Failures also carry "retryable": True for 429/5xx/network errors.
+        """
+        # Re-read token in case it was set later
+        if not self._headers:
+            self.refresh_token()
+        headers = self._headers
+        if not headers:
+            logger.error("NOTION_API_TOKEN not set in environment")
+            return {
+                "success": False,
+                "message": "Notion not configured (no token)",
+                "url": None,
+                "retryable": False
             }
-        }
         
-        logger.info(f"Trying alternative database ID: {alt_database_id}")
+        # Same idea sent again shortly (user re-send, AI double-fire) - reuse result
+        idempotency_key = self._idempotency_key(idea_text, user_id)
+        cached = self._get_recent_save(idempotency_key)
+        if cached:
+            logger.info(f"Idea already saved recently: {cached['url']}")
+            return cached
+        
+        logger.info(f"Saving idea to Notion: {idea_text[:50]}...")
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.notion_api_url,
-                    headers=headers,
-                    json=data,
-                    timeout=30.0
+            client = self._get_client()
+            
+            if not self._id_resolved and time.monotonic() >= self._resolve_retry_at:
+                await self._resolve_database_id(client, headers)
+            
+            # Notion title limit is 2000 chars
+            title = json_dumps(idea_text[:2000])
+            headers = {**headers, "Idempotency-Key": idempotency_key}
+            
+            response = await self._post_page(client, headers, self._body_template % title)
+            
+            if response.status_code == 404 and not self._id_resolved:
+                # Format still unknown - try the other database_id format
+                database_id = next(
+                    d for d in DATABASE_ID_CANDIDATES if d != self.database_id
                 )
+                logger.info(f"Trying alternative database ID: {database_id}")
+                response = await self._post_page(
+                    client,
+                    headers,
+                    self._build_body_template(database_id) % title
+                )
+                if response.is_success:
+                    self._remember_database_id(database_id)
+            
+            if response.is_success:
+                page_url = json_loads(response.content).get("url", "")
+                logger.info(f"Idea saved successfully: {page_url}")
+                result = {
+                    "success": True,
+                    "message": "Idea saved to Notion",
+                    "url": page_url
+                }
+                self._remember_save(idempotency_key, result)
+                return result
+            else:
+                # Error body is only decoded on the failure path
+                status = response.status_code
+                logger.error(f"Notion API error: {status} - {response.text}")
+                return {
+                    "success": False,
+                    "message": f"Notion API error: {status}",
+                    "url": None,
+                    "retryable": status == 429 or status >= 500
+                }
                 
-                logger.info(f"Alternative Notion API response: {response.status_code}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    page_url = result.get("url", "")
-                    # Update database_id to working one
-                    self.database_id = alt_database_id
-                    logger.info(f"Idea saved with alternative ID: {page_url}")
-                    return {
-                        "success": True,
-                        "message": "Idea saved to Notion",
-                        "url": page_url
-                    }
-                else:
-                    error_text = response.text
-                    logger.error(f"Alternative also failed: {response.status_code} - {error_text}")
-                    return {
-                        "success": False,
-                        "message": f"Notion API error: {response.status_code}",
-                        "url": None
-                    }
         except Exception as e:
-            logger.error(f"Error in alternative save: {e}")
+            logger.error(f"Error saving idea to Notion: {e}")
             return {
                 "success": False,
                 "message": f"Error: {str(e)}",
-                "url": None
+                "url": None,
+                "retryable": isinstance(e, httpx.TransportError)
             }
 
 
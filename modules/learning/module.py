@@ -2,12 +2,17 @@
 Learning planning module with smart recommendations
 50/50 Logic: half recommendations for lagging content, half for sequential progression
 """
+import asyncio
+import atexit
+import heapq
 import logging
-import json
 import os
 import random
-from typing import List, Dict, Optional, Tuple
-from datetime import date, datetime
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, List, Dict, Optional, Tuple
+from datetime import date
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     CommandHandler,
@@ -19,11 +24,72 @@ from telegram.ext import (
 from modules.base import BaseModule, owner_only
 from modules.notion.module import notion_module
 from config.settings import MAX_VALUES, CONTENT_EMOJI, CONTENT_NAMES_EN, SKILL_CATEGORIES, CATEGORY_EMOJI
+from utils.json_utils import dumps as json_dumps, loads as json_loads
 
 logger = logging.getLogger(__name__)
 
 # File for storing task history
 HISTORY_FILE = "/tmp/task_history.json"
+# How many days of task history to keep
+HISTORY_KEEP_DAYS = 7
+HISTORY_KEEP_SECONDS = HISTORY_KEEP_DAYS * 24 * 60 * 60
+# Window in which the same skill+content task is not recommended again
+RECENT_WINDOW_SECONDS = 2 * 24 * 60 * 60
+# Prune old history entries on the first save of a day or after this many saves
+HISTORY_PRUNE_EVERY = 16
+# Minimum seconds between history writes (pending changes are flushed on shutdown)
+HISTORY_FLUSH_INTERVAL = 30
+
+# Content types in a fixed order with matching skill fields and maximums
+CONTENT_KEYS = ("Lectures", "Practice hours", "Videos", "Films ", "VC Lectures")
+FIELD_KEYS = ("lectures", "practice_hours", "videos", "films", "vc_lectures")
+MAX_TUPLE = tuple(MAX_VALUES[k] for k in CONTENT_KEYS)
+TOTAL_MAX = sum(MAX_TUPLE)
+# (skill field, maximum) pairs for completion checks
+FIELD_MAX_PAIRS = tuple(zip(FIELD_KEYS, MAX_TUPLE))
+# (content key, skill field, emoji, English name, maximum) per content type
+CONTENT_META = tuple(
+    (k, f, CONTENT_EMOJI[k], CONTENT_NAMES_EN[k], m)
+    for k, f, m in zip(CONTENT_KEYS, FIELD_KEYS, MAX_TUPLE)
+)
+# Rows of the detailed skill card: (content key, skill field, emoji, label, maximum)
+PROGRESS_ROWS = tuple(
+    (k, f, emoji, label, MAX_VALUES[k])
+    for k, f, emoji, label in (
+        ("Lectures", "lectures", "📖", "Лекции"),
+        ("Practice hours", "practice_hours", "💪", "Практика"),
+        ("Videos", "videos", "🎬", "Видео"),
+        ("Films ", "films", "🎥", "Фильмы"),
+        ("VC Lectures", "vc_lectures", "🎤", "VC лекции"),
+    )
+)
+# Skill name -> category (reversed so the first listed category wins)
+SKILL_TO_CATEGORY = {
+    name: category
+    for category, names in reversed(list(SKILL_CATEGORIES.items()))
+    for name in names
+}
+# Русские названия типов контента для /tasks
+TASK_NAMES_RU = {
+    "lecture": "лекция",
+    "practice (1 hour)": "практика (1 час)",
+    "video": "видео",
+    "film": "фильм",
+    "VC lecture": "VC лекция"
+}
+# Detailed category view falls back to compact lines above this length
+# (Telegram message limit is 4096 chars)
+MAX_DETAILED_TEXT = 4000
+# Category buttons order in the progress summary
+CATEGORY_ORDER = ("Communication", "Thinking", "Adaptability", "Leadership", "Creativity")
+# Pre-rendered progress bars for the lengths in use: BAR_TABLES[length][filled]
+# (emoji that display well in Telegram)
+BAR_TABLES = {
+    length: tuple("🟩" * filled + "⬜" * (length - filled) for filled in range(length + 1))
+    for length in (5, 8, 10)
+}
+# Sequential learning order: Lectures -> Videos -> VC Lectures -> Films -> Practice
+SEQUENCE_ORDER = tuple(CONTENT_KEYS.index(k) for k in ("Lectures", "Videos", "VC Lectures", "Films ", "Practice hours"))
 
 
 class LearningModule(BaseModule):
@@ -44,55 +110,190 @@ class LearningModule(BaseModule):
             name="learning",
             description="Smart learning recommendations based on progress analysis"
         )
+        # (mtime_ns, size) of the history file as of the last load/save
+        self._history_stat: Optional[Tuple[int, int]] = None
+        # Own PRNG for recommendation variety
+        self._rng = random.Random()
         self.history = self._load_history()
+        self._prune_history()
+        # (skill, content_type) -> timestamp of the latest recommendation
+        self._recent: Dict[Tuple[str, str], float] = self._build_recent_index(self.history["tasks"])
+        # (notion cache version, skills ranked by overall progress, incomplete skills,
+        #  skill by 8-char id prefix as used in callback data, ranked skills by category)
+        self._view_cache: Optional[Tuple[
+            int,
+            List[Tuple[float, Dict]],
+            List[Dict],
+            Dict[str, Dict],
+            Dict[str, List[Tuple[float, Dict]]],
+        ]] = None
+        # Keyboard name -> (notion cache version, markup)
+        self._markup_cache: Dict[str, Tuple[int, InlineKeyboardMarkup]] = {}
+        self._history_dirty = False
+        self._last_flush: Optional[float] = None  # monotonic time of last write, None = never
+        # Background history writes: newest snapshot generation wins
+        self._write_lock = threading.Lock()
+        self._write_generation = 0
+        self._written_generation = 0
+        self._pending_writes: set = set()
+        atexit.register(self._flush_history)
+    
+    async def on_startup(self) -> None:
+        """Warms skill views (Notion module loads its cache before this one)"""
+        ranked, incomplete = self._views()
+        self._cached_markup("skills", lambda: self._build_skills_keyboard(ranked))
+        logger.info(
+            f"Learning views warmed: {len(ranked)} active, {len(incomplete)} incomplete"
+        )
+    
+    async def on_shutdown(self) -> None:
+        """Writes pending history changes on shutdown"""
+        self._flush_history()
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+    
+    @staticmethod
+    def _history_signature() -> Optional[Tuple[int, int]]:
+        """Returns (mtime_ns, size) of the history file or None if missing"""
+        try:
+            st = os.stat(HISTORY_FILE)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
     
     def _load_history(self) -> Dict:
         """Loads task history from file"""
+        self._history_stat = self._history_signature()
         try:
-            if os.path.exists(HISTORY_FILE):
-                with open(HISTORY_FILE, 'r') as f:
-                    return json.load(f)
+            if self._history_stat is not None:
+                with open(HISTORY_FILE, 'rb') as f:
+                    return json_loads(f.read())
         except Exception as e:
             logger.error(f"Error loading history: {e}")
         return {"tasks": [], "last_recommendation": None}
     
+    def _maybe_reload_history(self):
+        """Re-reads history only if the file changed on disk since last load/save"""
+        if self._history_dirty or self._pending_writes:
+            # Unsaved (or still being written) in-memory changes win over the file
+            return
+        signature = self._history_signature()
+        if signature is None or signature == self._history_stat:
+            return
+        self.history = self._load_history()
+        self._prune_history()
+        self._recent = self._build_recent_index(self.history["tasks"])
+    
+    @staticmethod
+    def _build_recent_index(tasks: List[Dict]) -> Dict[Tuple[str, str], float]:
+        """Builds latest-timestamp index for recency checks"""
+        recent = {}
+        for task in tasks:
+            key = (task.get("skill"), task.get("content_type"))
+            ts = task.get("timestamp", 0)
+            if ts > recent.get(key, 0):
+                recent[key] = ts
+        return recent
+    
+    def _prune_history(self):
+        """Drops tasks older than HISTORY_KEEP_DAYS"""
+        cutoff = time.time() - HISTORY_KEEP_SECONDS
+        self.history["tasks"] = [
+            t for t in self.history["tasks"] 
+            if t.get("timestamp", 0) > cutoff
+        ]
+        self._last_prune_date = date.today()
+        self._saves_since_prune = 0
+    
     def _save_history(self):
-        """Saves task history to file"""
+        """
+        Saves task history to file.
+        Inside the event loop the file is written in a worker thread.
+        """
         try:
-            # Keep only last 7 days
-            cutoff = datetime.now().timestamp() - (7 * 24 * 60 * 60)
-            self.history["tasks"] = [
-                t for t in self.history["tasks"] 
-                if t.get("timestamp", 0) > cutoff
-            ]
-            with open(HISTORY_FILE, 'w') as f:
-                json.dump(self.history, f)
+            if (self._saves_since_prune >= HISTORY_PRUNE_EVERY or
+                    self._last_prune_date != date.today()):
+                self._prune_history()
+            else:
+                self._saves_since_prune += 1
+            # Snapshot on the caller's thread so the dict can't change mid-encode
+            data = json_dumps(self.history)
         except Exception as e:
             logger.error(f"Error saving history: {e}")
+            return
+        
+        self._history_dirty = False
+        self._last_flush = time.monotonic()
+        self._write_generation += 1
+        generation = self._write_generation
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_history_file(data, generation)
+            return
+        
+        task = loop.create_task(asyncio.to_thread(self._write_history_file, data, generation))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+    
+    def _write_history_file(self, data: bytes, generation: int):
+        """Writes serialized history unless a newer snapshot was already written"""
+        with self._write_lock:
+            if generation <= self._written_generation:
+                return
+            try:
+                # Write to a temp file and swap it in so a crash never leaves a torn file
+                tmp_path = HISTORY_FILE + ".tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, HISTORY_FILE)
+                self._written_generation = generation
+                self._history_stat = self._history_signature()
+            except Exception as e:
+                logger.error(f"Error saving history: {e}")
+    
+    def _flush_history(self):
+        """Saves history only if it has unsaved changes"""
+        if self._history_dirty:
+            self._save_history()
     
-    def _add_to_history(self, skill_name: str, content_type: str):
+    def _add_to_history(
+        self,
+        skill_name: str,
+        content_type: str,
+        now: Optional[float] = None
+    ):
         """Adds task to history"""
+        timestamp = time.time() if now is None else now
         self.history["tasks"].append({
             "skill": skill_name,
             "content_type": content_type,
-            "timestamp": datetime.now().timestamp(),
-            "date": date.today().isoformat()
+            "timestamp": timestamp,
+            "date": date.fromtimestamp(timestamp).isoformat()
         })
+        self._recent[(skill_name, content_type)] = timestamp
+        self.history["rotation"] = self.history.get("rotation", 0) + 1
         self.history["last_recommendation"] = {
             "skill": skill_name,
             "content_type": content_type
         }
-        self._save_history()
+        self._history_dirty = True
+        if (self._last_flush is None or
+                time.monotonic() - self._last_flush >= HISTORY_FLUSH_INTERVAL):
+            self._save_history()
     
-    def _was_recommended_recently(self, skill_name: str, content_type: str) -> bool:
+    def _was_recommended_recently(
+        self,
+        skill_name: str,
+        content_type: str,
+        now: Optional[float] = None
+    ) -> bool:
         """Checks if this task was recommended recently (last 2 days)"""
-        cutoff = datetime.now().timestamp() - (2 * 24 * 60 * 60)
-        for task in self.history["tasks"]:
-            if (task.get("skill") == skill_name and 
-                task.get("content_type") == content_type and
-                task.get("timestamp", 0) > cutoff):
-                return True
-        return False
+        if now is None:
+            now = time.time()
+        cutoff = now - RECENT_WINDOW_SECONDS
+        return self._recent.get((skill_name, content_type), 0) > cutoff
     
     def get_handlers(self) -> List[BaseHandler]:
         """Returns command handlers"""
@@ -105,140 +306,236 @@ class LearningModule(BaseModule):
             CallbackQueryHandler(self.handle_category_selection, pattern="^cat_"),
         ]
     
-    def _calculate_content_progress(self, skill: Dict) -> Dict[str, float]:
-        """
-        Calculates progress for each content type in percentage.
-        """
-        return {
-            "Lectures": skill["lectures"] / MAX_VALUES["Lectures"] * 100,
-            "Practice hours": skill["practice_hours"] / MAX_VALUES["Practice hours"] * 100,
-            "Videos": skill["videos"] / MAX_VALUES["Videos"] * 100,
-            "Films ": skill["films"] / MAX_VALUES["Films "] * 100,
-            "VC Lectures": skill["vc_lectures"] / MAX_VALUES["VC Lectures"] * 100,
-        }
-    
     def _calculate_overall_progress(self, skill: Dict) -> float:
         """Calculates overall skill progress in percentage"""
-        total_current = (
-            skill["lectures"] + 
-            skill["practice_hours"] + 
-            skill["videos"] + 
-            skill["films"] + 
-            skill["vc_lectures"]
-        )
-        total_max = (
-            MAX_VALUES["Lectures"] + 
-            MAX_VALUES["Practice hours"] + 
-            MAX_VALUES["Videos"] + 
-            MAX_VALUES["Films "] + 
-            MAX_VALUES["VC Lectures"]
-        )
-        return (total_current / total_max * 100) if total_max > 0 else 0
+        if TOTAL_MAX <= 0:
+            return 0
+        return sum(skill[f] for f in FIELD_KEYS) / TOTAL_MAX * 100
     
-    def _find_weakest_content_type(self, skill: Dict) -> Tuple[str, float]:
-        """Finds content type with lowest progress."""
-        progress = self._calculate_content_progress(skill)
-        incomplete = {k: v for k, v in progress.items() if v < 100}
-        
-        if not incomplete:
-            return None, 100.0
-        
-        weakest = min(incomplete.items(), key=lambda x: x[1])
-        return weakest
+    def _skill_stats(self, skill: Dict) -> Tuple[List[float], float, Optional[int]]:
+        """
+        One pass over content types: per-content progress, overall progress
+        and index of the lagging (lowest incomplete) content type.
+        """
+        pcts = []
+        total_current = 0
+        weakest = None
+        weakest_pct = 100.0
+        for i, (field, maximum) in enumerate(FIELD_MAX_PAIRS):
+            current = skill[field]
+            total_current += current
+            pct = current / maximum * 100
+            pcts.append(pct)
+            if pct < weakest_pct:
+                weakest, weakest_pct = i, pct
+        overall = total_current / TOTAL_MAX * 100 if TOTAL_MAX > 0 else 0
+        return pcts, overall, weakest
+    
+    def _rank_by_progress(self, skills: List[Dict]) -> List[Tuple[float, Dict]]:
+        """Returns (overall progress, skill) pairs sorted from highest to lowest"""
+        ranked = [(self._calculate_overall_progress(s), s) for s in skills]
+        ranked.sort(key=lambda x: x[0], reverse=True)
+        return ranked
     
-    def _find_next_sequential_content(self, skill: Dict) -> Optional[Tuple[str, float]]:
+    def _views(self) -> Tuple[List[Tuple[float, Dict]], List[Dict]]:
         """
-        Finds next content type for sequential learning.
-        Priority: Lectures -> Videos -> VC Lectures -> Films -> Practice
+        Returns (ranked, incomplete) views of active skills.
+        Cached until the Notion skills cache changes.
         """
-        progress = self._calculate_content_progress(skill)
-        
-        # Order for sequential learning
-        sequence = ["Lectures", "Videos", "VC Lectures", "Films ", "Practice hours"]
-        
-        for content_type in sequence:
-            if progress.get(content_type, 100) < 100:
-                # Check if not recommended recently
-                if not self._was_recommended_recently(skill["name"], content_type):
-                    return content_type, progress[content_type]
-        
-        # If all were recommended recently, return first incomplete
-        for content_type in sequence:
-            if progress.get(content_type, 100) < 100:
-                return content_type, progress[content_type]
-        
-        return None, 100.0
+        version = notion_module.cache_version
+        if self._view_cache is None or self._view_cache[0] != version:
+            skills = notion_module.get_skills()
+            by_prefix = {}
+            for skill in skills:
+                by_prefix.setdefault(skill["id"][:8], skill)
+            ranked = self._rank_by_progress(skills)
+            # Grouping the ranking keeps each category sorted by progress
+            by_category = {}
+            for progress, skill in ranked:
+                category = self._get_skill_category(skill["name"])
+                by_category.setdefault(category, []).append((progress, skill))
+            self._view_cache = (
+                version,
+                ranked,
+                self._get_incomplete_skills(skills),
+                by_prefix,
+                by_category,
+            )
+        return self._view_cache[1], self._view_cache[2]
     
-    def _generate_recommendation(self, skill: Dict, mode: str = "weakest") -> Optional[Dict]:
+    def _ranked_in_category(self, category: str) -> List[Tuple[float, Dict]]:
+        """Ranked active skills of one category ("Other" for uncategorized)"""
+        self._views()
+        return self._view_cache[4].get(category, [])
+    
+    def _cached_markup(
+        self,
+        name: str,
+        build: Callable[[], InlineKeyboardMarkup]
+    ) -> InlineKeyboardMarkup:
+        """Returns keyboard built from skill views, rebuilt when Notion skills change"""
+        version = notion_module.cache_version
+        cached = self._markup_cache.get(name)
+        if cached is None or cached[0] != version:
+            cached = (version, build())
+            self._markup_cache[name] = cached
+        return cached[1]
+    
+    def _find_skill_by_prefix(self, skill_id_prefix: str) -> Optional[Dict]:
+        """Finds active skill by id prefix from callback data"""
+        self._views()
+        skill = self._view_cache[3].get(skill_id_prefix)
+        if skill is None:
+            # Unusual prefix length - fall back to a scan
+            for s in notion_module.get_skills():
+                if s["id"].startswith(skill_id_prefix):
+                    return s
+        return skill
+    
+    def _ranked_skills(self) -> List[Tuple[float, Dict]]:
+        """Active skills ranked by overall progress"""
+        return self._views()[0]
+    
+    def _pick_content(
+        self,
+        skill: Dict,
+        mode: str,
+        now: Optional[float] = None
+    ) -> Optional[Tuple[int, float]]:
         """
-        Generates recommendation for a skill.
+        Picks content type index and its progress for a skill.
         
         Args:
             skill: Skill data
             mode: "weakest" - lagging, "sequential" - sequential
+            now: Current timestamp for recency checks (defaults to time.time())
         """
+        # Single pass over content types: progress + choice without intermediate dicts
+        chosen = None
+        chosen_pct = 100.0
         if mode == "sequential":
-            content_type, progress = self._find_next_sequential_content(skill)
+            fallback = None
+            for i in SEQUENCE_ORDER:
+                pct = skill[FIELD_KEYS[i]] / MAX_TUPLE[i] * 100
+                if pct < 100:
+                    if not self._was_recommended_recently(skill["name"], CONTENT_KEYS[i], now):
+                        chosen, chosen_pct = i, pct
+                        break
+                    if fallback is None:
+                        fallback = (i, pct)
+            # If all were recommended recently, take first incomplete
+            if chosen is None and fallback is not None:
+                chosen, chosen_pct = fallback
         else:
-            content_type, progress = self._find_weakest_content_type(skill)
+            for i in range(len(CONTENT_KEYS)):
+                pct = skill[FIELD_KEYS[i]] / MAX_TUPLE[i] * 100
+                if pct < chosen_pct:
+                    chosen, chosen_pct = i, pct
         
-        if content_type is None:
+        if chosen is None:
             return None
-        
-        field_map = {
-            "Lectures": skill["lectures"],
-            "Practice hours": skill["practice_hours"],
-            "Videos": skill["videos"],
-            "Films ": skill["films"],
-            "VC Lectures": skill["vc_lectures"],
-        }
-        
-        current = field_map[content_type]
-        maximum = MAX_VALUES[content_type]
-        emoji = CONTENT_EMOJI[content_type]
-        name_en = CONTENT_NAMES_EN[content_type]
-        
+        return chosen, chosen_pct
+    
+    def _build_recommendation(self, skill: Dict, index: int, progress: float, mode: str) -> Dict:
+        """Builds recommendation dict for the chosen content type"""
+        content_type, field, emoji, name_en, maximum = CONTENT_META[index]
         return {
             "skill_name": skill["name"],
             "content_type": content_type,
             "content_name_en": name_en,
             "emoji": emoji,
-            "current": current,
+            "current": skill[field],
             "maximum": maximum,
             "progress_pct": progress,
             "mode": mode,
         }
     
+    def _generate_recommendation(self, skill: Dict, mode: str = "weakest") -> Optional[Dict]:
+        """
+        Generates recommendation for a skill.
+        
+        Args:
+            skill: Skill data
+            mode: "weakest" - lagging, "sequential" - sequential
+        """
+        picked = self._pick_content(skill, mode)
+        if picked is None:
+            return None
+        return self._build_recommendation(skill, picked[0], picked[1], mode)
+    
+    def _select_candidate(
+        self,
+        skills: List[Dict],
+        pick_mode: str,
+        select_mode: str,
+        now: float,
+        skip_recent: bool
+    ) -> Optional[Tuple[Dict, Tuple[int, float]]]:
+        """
+        Picks content per skill with pick_mode and selects one skill in a single pass.
+        select_mode "sequential" - uniform random choice (reservoir sampling),
+        otherwise - minimum progress (first one wins on ties).
+        """
+        best = None
+        best_pct = float("inf")
+        seen = 0
+        for skill in skills:
+            picked = self._pick_content(skill, pick_mode, now)
+            if not picked:
+                continue
+            if skip_recent and self._was_recommended_recently(skill["name"], CONTENT_KEYS[picked[0]], now):
+                continue
+            if select_mode == "sequential":
+                # For sequential - random choice for variety
+                seen += 1
+                if self._rng.randrange(seen) == 0:
+                    best = (skill, picked)
+            elif picked[1] < best_pct:
+                # For lagging - minimum progress
+                best, best_pct = (skill, picked), picked[1]
+        return best
+    
     def _generate_smart_task(self, skills: List[Dict]) -> Optional[Dict]:
         """
         Generates smart task with 50/50 logic.
-        50% - lagging, 50% - sequential progression.
+        Modes alternate: lagging, then sequential progression.
         """
         if not skills:
             return None
         
-        # Determine mode: 50/50
-        use_sequential = random.random() < 0.5
-        mode = "sequential" if use_sequential else "weakest"
+        self._maybe_reload_history()
+        now = time.time()
         
-        # Collect recommendations for all skills
-        recommendations = []
-        for skill in skills:
-            rec = self._generate_recommendation(skill, mode)
-            if rec:
-                # Check if not recommended recently
-                if not self._was_recommended_recently(rec["skill_name"], rec["content_type"]):
-                    recommendations.append(rec)
+        # Determine mode: strict rotation keeps the 50/50 split without streaks
+        use_sequential = self.history.get("rotation", 0) % 2 == 1
+        mode = "sequential" if use_sequential else "weakest"
+        alt_mode = "weakest" if use_sequential else "sequential"
+        
+        # Single skill: nothing to choose between, same fallbacks as below
+        if len(skills) == 1:
+            skill = skills[0]
+            rec_mode = mode
+            picked = self._pick_content(skill, mode, now)
+            if picked is None or self._was_recommended_recently(skill["name"], CONTENT_KEYS[picked[0]], now):
+                rec_mode = alt_mode
+                picked = self._pick_content(skill, alt_mode, now)
+            if picked is None:
+                return self._generate_recommendation(skill, "weakest")
+            best_rec = self._build_recommendation(skill, picked[0], picked[1], rec_mode)
+            self._add_to_history(best_rec["skill_name"], best_rec["content_type"], now)
+            return best_rec
+        
+        # Choose in one pass over skills, no candidate list;
+        # the recommendation dict is built only for the chosen one
+        rec_mode = mode
+        best = self._select_candidate(skills, mode, mode, now, skip_recent=True)
         
         # If all were recommended recently, try other mode
-        if not recommendations:
-            alt_mode = "weakest" if use_sequential else "sequential"
-            for skill in skills:
-                rec = self._generate_recommendation(skill, alt_mode)
-                if rec:
-                    recommendations.append(rec)
+        if best is None:
+            rec_mode = alt_mode
+            best = self._select_candidate(skills, alt_mode, mode, now, skip_recent=False)
         
-        if not recommendations:
+        if best is None:
             # Return any incomplete task
             for skill in skills:
                 rec = self._generate_recommendation(skill, "weakest")
@@ -246,72 +543,60 @@ class LearningModule(BaseModule):
                     return rec
             return None
         
-        # Choose random recommendation for variety
-        if mode == "sequential":
-            # For sequential - random choice from skills
-            best_rec = random.choice(recommendations)
-        else:
-            # For lagging - choose with minimum progress
-            best_rec = min(recommendations, key=lambda x: x["progress_pct"])
+        skill, (index, progress) = best
+        best_rec = self._build_recommendation(skill, index, progress, rec_mode)
         
         # Add to history
-        self._add_to_history(best_rec["skill_name"], best_rec["content_type"])
+        self._add_to_history(best_rec["skill_name"], best_rec["content_type"], now)
         
         return best_rec
     
     def _is_skill_completed(self, skill: Dict) -> bool:
         """Checks if skill is fully completed"""
-        return (
-            skill["lectures"] >= MAX_VALUES["Lectures"] and
-            skill["practice_hours"] >= MAX_VALUES["Practice hours"] and
-            skill["videos"] >= MAX_VALUES["Videos"] and
-            skill["films"] >= MAX_VALUES["Films "] and
-            skill["vc_lectures"] >= MAX_VALUES["VC Lectures"]
-        )
+        return all(skill[f] >= m for f, m in FIELD_MAX_PAIRS)
     
     def _get_incomplete_skills(self, skills: List[Dict]) -> List[Dict]:
         """Returns only incomplete skills"""
         return [s for s in skills if not self._is_skill_completed(s)]
     
+    def _incomplete_view(self, skills: Optional[List[Dict]]) -> Tuple[bool, List[Dict]]:
+        """
+        Returns (has active skills, incomplete skills).
+        With skills=None reads the cached views of Notion's active skills.
+        """
+        if skills is None:
+            ranked, incomplete = self._views()
+            return bool(ranked), incomplete
+        return bool(skills), self._get_incomplete_skills(skills)
+    
     def _progress_bar(self, current: float, maximum: float, length: int = 10) -> str:
         """Generates beautiful progress bar with emoji"""
         if maximum <= 0:
-            return "⬜" * length
-        ratio = min(current / maximum, 1.0)
-        filled = int(ratio * length)
-        # Use emoji that display well in Telegram
+            filled = 0
+        else:
+            ratio = min(current / maximum, 1.0)
+            filled = int(ratio * length)
+        table = BAR_TABLES.get(length)
+        if table is not None and 0 <= filled <= length:
+            return table[filled]
         return "🟩" * filled + "⬜" * (length - filled)
     
     def _get_skill_category(self, skill_name: str) -> str:
         """Determines skill category"""
-        for category, skills in SKILL_CATEGORIES.items():
-            if skill_name in skills:
-                return category
-        return "Other"
+        return SKILL_TO_CATEGORY.get(skill_name, "Other")
     
-    def _format_skill_progress(self, skill: Dict) -> str:
+    def _format_skill_progress(self, skill: Dict, overall_pct: Optional[float] = None) -> str:
         """Formats progress for one skill - beautiful format"""
-        lines = []
-        lines.append(f"📚 *{skill['name']}*\n")
-        
-        # Calculate overall progress
-        overall_pct = self._calculate_overall_progress(skill)
-        lines.append(f"Общий прогресс: *{overall_pct:.0f}%*\n\n")
-        
-        # Find lagging content type
-        weakest, _ = self._find_weakest_content_type(skill)
+        # Overall progress and lagging content type in one pass
+        _, overall, weakest_index = self._skill_stats(skill)
+        if overall_pct is None:
+            overall_pct = overall
+        weakest = CONTENT_KEYS[weakest_index] if weakest_index is not None else None
         
         # Progress for each content type
-        progress_items = [
-            ("Lectures", skill["lectures"], "📖", "Лекции"),
-            ("Practice hours", skill["practice_hours"], "💪", "Практика"),
-            ("Videos", skill["videos"], "🎬", "Видео"),
-            ("Films ", skill["films"], "🎥", "Фильмы"),
-            ("VC Lectures", skill["vc_lectures"], "🎤", "VC лекции"),
-        ]
-        
-        for key, current, emoji, label in progress_items:
-            maximum = MAX_VALUES[key]
+        rows = []
+        for key, field, emoji, label, maximum in PROGRESS_ROWS:
+            current = skill[field]
             bar = self._progress_bar(current, maximum, 8)
             
             # Mark lagging content type
@@ -322,57 +607,66 @@ class LearningModule(BaseModule):
             else:
                 value_str = f"{int(current)}/{maximum}"
             
-            lines.append(f"{emoji} {label}: {value_str}{marker}\n")
-            lines.append(f"    {bar}\n")
+            rows.append(f"{emoji} {label}: {value_str}{marker}\n    {bar}\n")
         
-        return "".join(lines)
+        return f"📚 *{skill['name']}*\nОбщий прогресс: *{overall_pct:.0f}%*\n\n{''.join(rows)}"
     
-    def _format_skill_compact(self, skill: Dict) -> str:
+    def _format_skill_compact(self, skill: Dict, progress: Optional[float] = None) -> str:
         """Formats skill in compact view (one line)"""
-        progress = self._calculate_overall_progress(skill)
+        if progress is None:
+            progress = self._calculate_overall_progress(skill)
         bar = self._progress_bar(progress, 100, 5)
         return f"• {skill['name']}: {bar} {progress:.0f}%"
     
+    @staticmethod
+    def _take_unique_tasks(candidates, count: int) -> Tuple[List[Dict], bool]:
+        """Builds up to `count` task dicts, skipping repeated skill+content pairs"""
+        tasks = []
+        seen = set()
+        dropped = False
+        for pct, _, skill, i in candidates:
+            if len(tasks) >= count:
+                break
+            content_type, field, emoji, name_en, maximum = CONTENT_META[i]
+            key = (skill["name"], content_type)
+            if key in seen:
+                dropped = True
+                continue
+            seen.add(key)
+            tasks.append({
+                "skill_name": skill["name"],
+                "content_type": content_type,
+                "content_name_en": name_en,
+                "emoji": emoji,
+                "current": skill[field],
+                "maximum": maximum,
+                "progress_pct": pct,
+            })
+        return tasks, dropped
+    
     def _get_daily_tasks(self, skills: List[Dict], count: int = 3) -> List[Dict]:
         """
         Generates multiple daily tasks.
         Prioritizes lagging content types across all skills.
         """
-        tasks = []
-        
-        # Collect ALL incomplete content types from all skills
-        all_content = []
-        for skill in skills:
-            progress = self._calculate_content_progress(skill)
-            for content_type, pct in progress.items():
-                if pct < 100:
-                    field_map = {
-                        "Lectures": skill["lectures"],
-                        "Practice hours": skill["practice_hours"],
-                        "Videos": skill["videos"],
-                        "Films ": skill["films"],
-                        "VC Lectures": skill["vc_lectures"],
-                    }
-                    all_content.append({
-                        "skill_name": skill["name"],
-                        "content_type": content_type,
-                        "content_name_en": CONTENT_NAMES_EN[content_type],
-                        "emoji": CONTENT_EMOJI[content_type],
-                        "current": field_map[content_type],
-                        "maximum": MAX_VALUES[content_type],
-                        "progress_pct": pct,
-                    })
-        
-        # Sort by progress (lowest first = most lagging)
-        all_content.sort(key=lambda x: x["progress_pct"])
-        
-        # Take top N unique tasks (different skill+content combinations)
-        seen = set()
-        for item in all_content:
-            key = (item["skill_name"], item["content_type"])
-            if key not in seen and len(tasks) < count:
-                tasks.append(item)
-                seen.add(key)
+        # Lazily yield ALL incomplete content types from all skills as
+        # (progress, position, skill, content index) - dicts are built only for picked tasks
+        def incomplete_content():
+            position = 0
+            for skill in skills:
+                for i, (_, field, _, _, maximum) in enumerate(CONTENT_META):
+                    pct = skill[field] / maximum * 100
+                    if pct < 100:
+                        yield pct, position, skill, i
+                        position += 1
+        
+        # Partial sort: only the `count` most lagging entries are kept in a heap
+        tasks, dropped = self._take_unique_tasks(
+            heapq.nsmallest(count, incomplete_content()), count
+        )
+        if dropped and len(tasks) < count:
+            # Duplicate skill names ate some picks - fall back to the full ordering
+            tasks, _ = self._take_unique_tasks(sorted(incomplete_content()), count)
         
         return tasks
     
@@ -383,11 +677,11 @@ class LearningModule(BaseModule):
         context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         """Command /today - shows today's tasks (multiple)"""
-        # Auto-sync with Notion
-        await notion_module.refresh_skills_cache()
-        skills = notion_module.get_skills()
+        # Auto-sync with Notion (shared between commands sent in quick succession)
+        await notion_module.refresh_skills_cache_if_stale()
+        ranked, incomplete = self._views()
         
-        if not skills:
+        if not ranked:
             await update.message.reply_text(
                 "📚 У тебя пока нет активных навыков.\n\n"
                 "Чтобы начать:\n"
@@ -397,8 +691,6 @@ class LearningModule(BaseModule):
             )
             return
         
-        incomplete = self._get_incomplete_skills(skills)
-        
         if not incomplete:
             await update.message.reply_text(
                 "🎉 Поздравляю! Все активные навыки полностью изучены!"
@@ -413,30 +705,21 @@ class LearningModule(BaseModule):
             return
         
         # Форматируем сообщение с задачами
-        text = "🎯 **Задачи на сегодня**\n\n"
-        
-        # Русские названия типов контента
-        content_names_ru = {
-            "lecture": "лекция",
-            "practice (1 hour)": "практика (1 час)",
-            "video": "видео",
-            "film": "фильм",
-            "VC lecture": "VC лекция"
-        }
+        parts = ["🎯 **Задачи на сегодня**\n\n"]
         
         for i, task in enumerate(tasks, 1):
             bar = self._progress_bar(task['current'], task['maximum'], 8)
-            content_name = content_names_ru.get(task['content_name_en'], task['content_name_en'])
-            text += f"**{i}. {task['skill_name']}**\n"
-            text += f"{task['emoji']} {content_name}: {bar} {task['current']:.0f}/{task['maximum']}\n"
+            content_name = TASK_NAMES_RU.get(task['content_name_en'], task['content_name_en'])
+            parts.append(f"**{i}. {task['skill_name']}**\n")
+            parts.append(f"{task['emoji']} {content_name}: {bar} {task['current']:.0f}/{task['maximum']}\n")
             if task['progress_pct'] < 20:
-                text += "⚠️ _Требует внимания!_\n"
-            text += "\n"
+                parts.append("⚠️ _Требует внимания!_\n")
+            parts.append("\n")
         
-        text += "_Задачи отсортированы по приоритету (самые отстающие сначала)_\n\n"
-        text += "После выполнения обнови прогресс в Notion и нажми /sync"
+        parts.append("_Задачи отсортированы по приоритету (самые отстающие сначала)_\n\n")
+        parts.append("После выполнения обнови прогресс в Notion и нажми /sync")
         
-        await update.message.reply_text(text, parse_mode='Markdown')
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
     
     @owner_only
     async def recommend_command(
@@ -454,8 +737,8 @@ class LearningModule(BaseModule):
         context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         """Command /skills - shows list of skills with buttons"""
-        # Auto-sync with Notion
-        await notion_module.refresh_skills_cache()
+        # Auto-sync with Notion (shared between commands sent in quick succession)
+        await notion_module.refresh_skills_cache_if_stale()
         await self._show_skills_menu(update, context)
     
     async def _show_skills_menu(
@@ -465,9 +748,10 @@ class LearningModule(BaseModule):
         edit_message: bool = False
     ) -> None:
         """Shows menu with skill buttons"""
-        skills = notion_module.get_skills()
+        # Skills sorted by progress (highest to lowest)
+        ranked = self._ranked_skills()
         
-        if not skills:
+        if not ranked:
             text = (
                 "📚 You don't have any active skills yet.\n\n"
                 "To start:\n"
@@ -481,21 +765,7 @@ class LearningModule(BaseModule):
                 await update.message.reply_text(text)
             return
         
-        # Sort skills by progress (highest to lowest)
-        sorted_skills = sorted(
-            skills,
-            key=lambda s: self._calculate_overall_progress(s),
-            reverse=True
-        )
-        
-        # Create buttons for each skill
-        keyboard = []
-        for skill in sorted_skills:
-            progress = self._calculate_overall_progress(skill)
-            btn_text = f"📚 {skill['name']} ({progress:.0f}%)"
-            keyboard.append([InlineKeyboardButton(btn_text, callback_data=f"skill_{skill['id'][:8]}")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._cached_markup("skills", lambda: self._build_skills_keyboard(ranked))
         
         text = "📊 **Select a skill to view:**"
         
@@ -512,6 +782,14 @@ class LearningModule(BaseModule):
                 reply_markup=reply_markup
             )
     
+    def _build_skills_keyboard(self, ranked: List[Tuple[float, Dict]]) -> InlineKeyboardMarkup:
+        """Creates buttons for each skill"""
+        keyboard = []
+        for progress, skill in ranked:
+            btn_text = f"📚 {skill['name']} ({progress:.0f}%)"
+            keyboard.append([InlineKeyboardButton(btn_text, callback_data=f"skill_{skill['id'][:8]}")])
+        return InlineKeyboardMarkup(keyboard)
+    
     @owner_only
     async def handle_skill_selection(
         self,
@@ -531,12 +809,7 @@ class LearningModule(BaseModule):
         # Extract skill ID
         skill_id_prefix = data.replace("skill_", "")
         
-        skills = notion_module.get_skills()
-        skill = None
-        for s in skills:
-            if s["id"].startswith(skill_id_prefix):
-                skill = s
-                break
+        skill = self._find_skill_by_prefix(skill_id_prefix)
         
         if not skill:
             await query.edit_message_text("❌ Навык не найден. Используй /sync")
@@ -564,69 +837,86 @@ class LearningModule(BaseModule):
         context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         """Command /progress - shows progress summary with category buttons"""
-        # Auto-sync with Notion
-        await notion_module.refresh_skills_cache()
-        skills = notion_module.get_skills()
+        # Auto-sync with Notion (shared between commands sent in quick succession)
+        await notion_module.refresh_skills_cache_if_stale()
         
-        if not skills:
+        if not self._ranked_skills():
             await update.message.reply_text(
                 "📚 У тебя пока нет активных навыков.\n"
                 "Начни изучать навык в Notion, затем используй /sync"
             )
             return
         
-        await self._show_progress_summary(update, skills)
+        await self._show_progress_summary(update)
     
     async def _show_progress_summary(
         self,
         update: Update,
-        skills: List[Dict],
         edit_message: bool = False
     ) -> None:
         """Shows progress summary with category buttons"""
-        # Calculate average progress
-        avg_progress = sum(self._calculate_overall_progress(s) for s in skills) / len(skills)
-        
-        # Sort skills by progress
-        sorted_skills = sorted(
-            skills,
-            key=lambda s: self._calculate_overall_progress(s),
-            reverse=True
-        )
+        # Active skills sorted by progress
+        ranked = self._ranked_skills()
+        
+        # One pass: total progress, skills needing attention (< 50%), category counts.
+        # The ranking is descending, so the last three below 50% are the ones shown
+        total_progress = 0
+        need_attention = deque(maxlen=3)
+        category_counts = Counter()
+        for progress, skill in ranked:
+            total_progress += progress
+            if progress < 50:
+                need_attention.append((progress, skill))
+            category_counts[self._get_skill_category(skill["name"])] += 1
+        avg_progress = total_progress / len(ranked)
         
         # Build summary text
-        text = f"📊 *Skill Progress*\n"
-        text += f"Active: {len(skills)} | Avg: {avg_progress:.0f}%\n\n"
+        parts = [
+            "📊 *Skill Progress*\n",
+            f"Active: {len(ranked)} | Avg: {avg_progress:.0f}%\n\n",
+        ]
         
         # Top 3 skills
-        text += "🏆 *Top 3:*\n"
-        for skill in sorted_skills[:3]:
-            progress = self._calculate_overall_progress(skill)
-            text += f"• {skill['name']} — {progress:.0f}%\n"
+        parts.append("🏆 *Top 3:*\n")
+        for progress, skill in ranked[:3]:
+            parts.append(f"• {skill['name']} — {progress:.0f}%\n")
         
         # Need attention (bottom 3 with < 50%)
-        need_attention = [s for s in sorted_skills if self._calculate_overall_progress(s) < 50]
         if need_attention:
-            text += f"\n⚠️ *Need attention:*\n"
-            for skill in need_attention[-3:]:
-                progress = self._calculate_overall_progress(skill)
-                text += f"• {skill['name']} — {progress:.0f}%\n"
+            parts.append("\n⚠️ *Need attention:*\n")
+            for progress, skill in need_attention:
+                parts.append(f"• {skill['name']} — {progress:.0f}%\n")
         
-        text += "\n_Select category for details:_"
+        parts.append("\n_Select category for details:_")
+        text = "".join(parts)
         
         # Create category buttons
-        keyboard = []
+        reply_markup = self._cached_markup(
+            "categories",
+            lambda: self._build_category_keyboard(category_counts, len(ranked))
+        )
         
-        # Count skills per category
-        category_counts = {}
-        for skill in skills:
-            cat = self._get_skill_category(skill["name"])
-            category_counts[cat] = category_counts.get(cat, 0) + 1
+        if edit_message and update.callback_query:
+            await update.callback_query.edit_message_text(
+                text,
+                parse_mode='Markdown',
+                reply_markup=reply_markup
+            )
+        else:
+            await update.message.reply_text(
+                text,
+                parse_mode='Markdown',
+                reply_markup=reply_markup
+            )
+    
+    def _build_category_keyboard(self, category_counts: Counter, total: int) -> InlineKeyboardMarkup:
+        """Creates category buttons for the progress summary"""
+        keyboard = []
         
         # Add category buttons (2 per row)
         row = []
-        for category in ["Communication", "Thinking", "Adaptability", "Leadership", "Creativity"]:
-            count = category_counts.get(category, 0)
+        for category in CATEGORY_ORDER:
+            count = category_counts[category]
             if count > 0:
                 emoji = CATEGORY_EMOJI.get(category, "📁")
                 btn_text = f"{emoji} {category} ({count})"
@@ -639,26 +929,13 @@ class LearningModule(BaseModule):
             keyboard.append(row)
         
         # Add "All" and "Other" buttons
-        other_count = category_counts.get("Other", 0)
-        bottom_row = [InlineKeyboardButton(f"📊 All ({len(skills)})", callback_data="cat_All")]
+        other_count = category_counts["Other"]
+        bottom_row = [InlineKeyboardButton(f"📊 All ({total})", callback_data="cat_All")]
         if other_count > 0:
             bottom_row.append(InlineKeyboardButton(f"📁 Other ({other_count})", callback_data="cat_Other"))
         keyboard.append(bottom_row)
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        if edit_message and update.callback_query:
-            await update.callback_query.edit_message_text(
-                text,
-                parse_mode='Markdown',
-                reply_markup=reply_markup
-            )
-        else:
-            await update.message.reply_text(
-                text,
-                parse_mode='Markdown',
-                reply_markup=reply_markup
-            )
+        return InlineKeyboardMarkup(keyboard)
     
     @owner_only
     async def handle_category_selection(
@@ -674,55 +951,53 @@ class LearningModule(BaseModule):
         category = data.replace("cat_", "")
         
         if category == "back":
-            skills = notion_module.get_skills()
-            await self._show_progress_summary(update, skills, edit_message=True)
+            await self._show_progress_summary(update, edit_message=True)
             return
         
-        skills = notion_module.get_skills()
-        
-        # Filter skills by category
+        # Cached progress ranking (grouped by category once per Notion refresh)
         if category == "All":
-            filtered_skills = skills
+            ranked = self._ranked_skills()
             title = "📊 Все навыки"
         elif category == "Other":
-            filtered_skills = [s for s in skills if self._get_skill_category(s["name"]) == "Other"]
+            ranked = self._ranked_in_category("Other")
             title = "📁 Другие навыки"
         else:
-            filtered_skills = [s for s in skills if self._get_skill_category(s["name"]) == category]
+            ranked = self._ranked_in_category(category)
             emoji = CATEGORY_EMOJI.get(category, "📁")
             title = f"{emoji} {category}"
         
-        if not filtered_skills:
+        if not ranked:
             await query.answer("Нет навыков в этой категории", show_alert=True)
             return
         
-        # Sort by progress
-        sorted_skills = sorted(
-            filtered_skills,
-            key=lambda s: self._calculate_overall_progress(s),
-            reverse=True
-        )
-        
-        # Build text
-        text = f"*{title}*\n"
-        text += f"Навыков: {len(filtered_skills)}\n\n"
-        
-        for skill in sorted_skills:
-            text += self._format_skill_progress(skill)
-            text += "\n"
+        # Build text, giving up on the detailed view as soon as it gets too long
+        header = f"*{title}*\nНавыков: {len(ranked)}\n\n"
+        parts = [header]
+        length = len(header)
+        too_long = False
+        for progress, skill in ranked:
+            card = self._format_skill_progress(skill, progress)
+            length += len(card) + 1
+            if length > MAX_DETAILED_TEXT:
+                too_long = True
+                break
+            parts.append(card)
+            parts.append("\n")
         
         # Back button
         keyboard = [[InlineKeyboardButton("⬅️ Назад к сводке", callback_data="cat_back")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        # Telegram message limit is 4096 chars
-        if len(text) > 4000:
+        if not too_long:
+            text = "".join(parts)
+        else:
             # Truncate and show compact view
-            text = f"*{title}*\n"
-            text += f"Навыков: {len(filtered_skills)}\n\n"
-            for skill in sorted_skills:
-                text += self._format_skill_compact(skill) + "\n"
-            text += "\n_Используй /skills для подробного просмотра_"
+            parts = [header]
+            for progress, skill in ranked:
+                parts.append(self._format_skill_compact(skill, progress))
+                parts.append("\n")
+            parts.append("\n_Используй /skills для подробного просмотра_")
+            text = "".join(parts)
         
         await query.edit_message_text(
             text,
@@ -730,17 +1005,20 @@ class LearningModule(BaseModule):
             reply_markup=reply_markup
         )
     
-    def generate_evening_task_message(self, skills: List[Dict]) -> str:
-        """Generates evening message with task (8:00 PM)"""
-        if not skills:
+    def generate_evening_task_message(self, skills: Optional[List[Dict]] = None) -> str:
+        """
+        Generates evening message with task (8:00 PM).
+        Without skills uses the cached active skills from Notion.
+        """
+        has_skills, incomplete = self._incomplete_view(skills)
+        
+        if not has_skills:
             return (
                 "🌆 **Добрый вечер!**\n\n"
                 "У тебя пока нет активных навыков.\n"
                 "Начни изучать что-то новое в Notion!"
             )
         
-        incomplete = self._get_incomplete_skills(skills)
-        
         if not incomplete:
             return (
                 "🌆 **Добрый вечер!**\n\n"
@@ -760,27 +1038,30 @@ class LearningModule(BaseModule):
         else:
             reason = "Этот тип контента отстаёт"
         
-        message = f"🌆 **Добрый вечер!**\n\n"
-        message += f"🎯 Вечерняя задача:\n\n"
-        message += f"Навык: **{task['skill_name']}**\n"
-        message += f"{task['emoji']} {task['content_name_en']}:\n"
-        message += f"{bar} {task['current']:.0f}/{task['maximum']}\n\n"
-        message += f"_{reason}_\n\n"
-        message += f"После выполнения обнови прогресс в Notion!"
-        
-        return message
+        return (
+            "🌆 **Добрый вечер!**\n\n"
+            "🎯 Вечерняя задача:\n\n"
+            f"Навык: **{task['skill_name']}**\n"
+            f"{task['emoji']} {task['content_name_en']}:\n"
+            f"{bar} {task['current']:.0f}/{task['maximum']}\n\n"
+            f"_{reason}_\n\n"
+            "После выполнения обнови прогресс в Notion!"
+        )
     
-    def generate_single_task_message(self, skills: List[Dict]) -> str:
-        """Generates simple message with one task (8:00 PM)"""
-        if not skills:
+    def generate_single_task_message(self, skills: Optional[List[Dict]] = None) -> str:
+        """
+        Generates simple message with one task (8:00 PM).
+        Without skills uses the cached active skills from Notion.
+        """
+        has_skills, incomplete = self._incomplete_view(skills)
+        
+        if not has_skills:
             return (
                 "🎯 **Задача на вечер**\n\n"
                 "У тебя пока нет активных навыков.\n"
                 "Начни изучать что-то новое в Notion!"
             )
         
-        incomplete = self._get_incomplete_skills(skills)
-        
         if not incomplete:
             return (
                 "🎯 **Задача на вечер**\n\n"
@@ -795,13 +1076,13 @@ class LearningModule(BaseModule):
         
         bar = self._progress_bar(task['current'], task['maximum'], 10)
         
-        message = f"🎯 **Задача на вечер**\n\n"
-        message += f"**{task['skill_name']}**\n"
-        message += f"{task['emoji']} {task['content_name_en']}\n"
-        message += f"{bar} {task['current']:.0f}/{task['maximum']}\n\n"
-        message += f"После выполнения обнови прогресс в Notion!"
-        
-        return message
+        return (
+            "🎯 **Задача на вечер**\n\n"
+            f"**{task['skill_name']}**\n"
+            f"{task['emoji']} {task['content_name_en']}\n"
+            f"{bar} {task['current']:.0f}/{task['maximum']}\n\n"
+            "После выполнения обнови прогресс в Notion!"
+        )
     
     def generate_morning_message(self) -> str:
         """Generates morning message (9:00 AM)"""
@@ -819,27 +1100,27 @@ class LearningModule(BaseModule):
                 "Завтра начни изучать новый навык в Notion!"
             )
         
+        progress = [(self._calculate_overall_progress(s), s) for s in skills]
+        
         # Calculate overall progress
-        total_progress = sum(self._calculate_overall_progress(s) for s in skills) / len(skills)
+        total_progress = sum(p for p, _ in progress) / len(progress)
         
-        message = f"🌙 **Спокойной ночи!**\n\n"
-        message += f"📊 Средний прогресс по навыкам: *{total_progress:.0f}%*\n\n"
+        # Only the top 3 are shown - no need to sort every skill
+        top = heapq.nlargest(3, progress, key=lambda x: x[0])
+        
+        parts = [
+            "🌙 **Спокойной ночи!**\n\n",
+            f"📊 Средний прогресс по навыкам: *{total_progress:.0f}%*\n\n",
+        ]
         
         # Show top 3 skills
-        sorted_skills = sorted(
-            skills,
-            key=lambda s: self._calculate_overall_progress(s),
-            reverse=True
-        )[:3]
-        
-        message += "🏆 Топ навыков:\n"
-        for i, skill in enumerate(sorted_skills, 1):
-            progress = self._calculate_overall_progress(skill)
-            message += f"{i}. {skill['name']} - {progress:.0f}%\n"
+        parts.append("🏆 Топ навыков:\n")
+        for i, (pct, skill) in enumerate(top, 1):
+            parts.append(f"{i}. {skill['name']} - {pct:.0f}%\n")
         
-        message += "\nОтдохни и восстанови силы! 💪"
+        parts.append("\nОтдохни и восстанови силы! 💪")
         
-        return message
+        return "".join(parts)
 
 
 # Module instance
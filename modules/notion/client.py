@@ -6,6 +6,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 import httpx
 
+from utils.json_utils import loads as json_loads
 from config.settings import (
     NOTION_API_TOKEN,
     NOTION_SKILLS_DATABASE_ID,
@@ -49,7 +50,7 @@ class NotionClient:
         try:
             response = await self._client.request(method, url, json=json)
             response.raise_for_status()
-            return response.json()
+            return json_loads(response.content)
         except httpx.HTTPStatusError as e:
             logger.error(f"Notion API error: {e.response.status_code} - {e.response.text}")
             raise
@@ -1,7 +1,9 @@
 """
 Notion integration module
 """
+import asyncio
 import logging
+import time
 from typing import List, Optional
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes, BaseHandler
@@ -11,6 +13,9 @@ from modules.notion.client import notion_client
 
 logger = logging.getLogger(__name__)
 
+# Seconds a successful refresh is reused by command handlers (/sync always refreshes)
+SKILLS_CACHE_TTL = 30
+
 
 class NotionModule(BaseModule):
     """
@@ -27,6 +32,10 @@ class NotionModule(BaseModule):
         self._all_skills_cache: List[dict] = []  # All skills
         self._active_skills_cache: List[dict] = []  # Only active
         self._cache_updated = None
+        # Incremented whenever active skills change (for dependent caches)
+        self.cache_version = 0
+        self._refreshed_at: Optional[float] = None  # monotonic time of last successful refresh
+        self._refresh_task: Optional[asyncio.Task] = None
     
     def get_handlers(self) -> List[BaseHandler]:
         """Returns command handlers"""
@@ -44,19 +53,24 @@ class NotionModule(BaseModule):
     
     async def refresh_skills_cache(self) -> List[dict]:
         """Refreshes skills cache"""
+        previous_active = self._active_skills_cache
         try:
             # Load all skills
-            self._all_skills_cache = await self.client.get_all_skills()
+            all_skills = await self.client.get_all_skills()
             
             # Filter only active (with progress > 0)
-            self._active_skills_cache = self.client.filter_active_skills(
-                self._all_skills_cache
-            )
+            active = self.client.filter_active_skills(all_skills)
             
             # Calculate priorities for active skills
-            self._active_skills_cache = self.client.calculate_skill_priorities(
-                self._active_skills_cache
-            )
+            active = self.client.calculate_skill_priorities(active)
+            
+            # Swap caches only once everything succeeded, so a failed refresh
+            # never leaves a half-updated list behind an unchanged cache_version
+            self._all_skills_cache = all_skills
+            if active != previous_active:
+                self.cache_version += 1
+            self._active_skills_cache = active
+            self._refreshed_at = time.monotonic()
             
             from datetime import datetime
             self._cache_updated = datetime.now()
@@ -72,6 +86,23 @@ class NotionModule(BaseModule):
             logger.error(f"Failed to refresh skills cache: {e}")
             return self._active_skills_cache
     
+    async def refresh_skills_cache_if_stale(
+        self,
+        max_age: float = SKILLS_CACHE_TTL
+    ) -> List[dict]:
+        """
+        Refreshes skills cache unless it was refreshed less than max_age seconds ago.
+        Concurrent callers share one in-flight refresh.
+        """
+        if (self._refreshed_at is not None and
+                time.monotonic() - self._refreshed_at < max_age):
+            return self._active_skills_cache
+        
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh_skills_cache())
+        # Shield so a cancelled handler doesn't cancel the refresh for the others
+        return await asyncio.shield(self._refresh_task)
+    
     def get_skills(self) -> List[dict]:
         """Returns cached ACTIVE skills"""
         return self._active_skills_cache
@@ -191,8 +191,8 @@ class ReminderService:
             return
         
         try:
-            skills = await notion_module.refresh_skills_cache()
-            base_message = learning_module.generate_single_task_message(skills)
+            await notion_module.refresh_skills_cache()
+            base_message = learning_module.generate_single_task_message()
             
             # Add learning progress reminder
             base_message += "\n\n📚 Не забудь отметить прогресс за день!\nИспользуй /today когда будешь готов."
@@ -0,0 +1,31 @@
+"""
+JSON helpers with optional orjson acceleration
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib
+    orjson = None
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    Parses JSON from bytes or str.
+    
+    With orjson the UTF-8 bytes are decoded in C without building an
+    intermediate str, so pass `response.content` rather than `response.text`.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializes object to UTF-8 encoded JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
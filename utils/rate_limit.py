@@ -0,0 +1,39 @@
+"""
+Rate limiting utilities for external APIs
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket limiter.
+    Allows bursts up to `capacity` requests, then `rate` requests per second.
+    
+    Notion API allows ~3 requests per second per integration, so waiting
+    locally is cheaper than getting 429 and backing off remotely.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Waits until a token is available and consumes it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) / self.rate)